@@ -0,0 +1,164 @@
+"""
+Реальные отсутствия водителей в SQLite (таблица models.Absence).
+
+Раньше записи жили в ABSENCES_FILE: каждое добавление переписывало JSON
+целиком, а удаление шло по номеру в списке. Теперь добавление — вставка
+одной строки, удаление — по id, а «кто отсутствует в смену shift дня day»
+— запрос по индексу (day, shift).
+
+Хранилище работает через SQLAlchemy Core поверх Absence.__table__, без
+контекста Flask-приложения, поэтому его используют и сервер, и планировщик
+(в том числе из CLI). Старый JSON переносится в базу один раз:
+автоматически при создании базы или командой
+
+    python -m structure_model.absence_store --import [файл.json]
+"""
+import argparse
+import json
+import os
+import threading
+from datetime import datetime
+
+from sqlalchemy import create_engine, delete, func, insert, select
+
+from structure_model.config import ABSENCES_DB, ABSENCES_FILE
+from structure_model.models import Absence
+
+absences = Absence.__table__
+
+
+def _record(row):
+    """Строка таблицы -> запись в прежнем формате JSON (+ id и время)."""
+    return {
+        "id": row.id,
+        "tab_no": row.tab_no,
+        "shift": row.shift,
+        "day": row.day,
+        "reason": row.reason,
+        "timestamp": row.created_at.isoformat() if row.created_at else None,
+    }
+
+
+class AbsenceStore:
+    def __init__(self, path=ABSENCES_DB, json_file=ABSENCES_FILE):
+        self.path = path
+        self.json_file = json_file
+        self._engine = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    created = not os.path.exists(self.path)
+                    engine = create_engine(f"sqlite:///{self.path}")
+                    absences.create(engine, checkfirst=True)
+                    # Индексы могли появиться позже самой таблицы
+                    for index in absences.indexes:
+                        index.create(engine, checkfirst=True)
+                    self._engine = engine
+                    if created and self.json_file and os.path.exists(self.json_file):
+                        self.import_json(self.json_file)
+        return self._engine
+
+    # -------------------------------------------------------------------------
+    # Чтение
+    # -------------------------------------------------------------------------
+
+    def absent(self, day, shift):
+        """Табельные, отсутствующие в смену shift дня day."""
+        query = select(absences.c.tab_no).where(
+            absences.c.day == int(day), absences.c.shift == int(shift)
+        )
+        with self.engine.connect() as conn:
+            return frozenset(conn.execute(query).scalars())
+
+    def count(self):
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(absences)).scalar_one()
+
+    def count_drivers(self):
+        """Число разных водителей с отсутствиями."""
+        query = select(func.count(absences.c.tab_no.distinct()))
+        with self.engine.connect() as conn:
+            return conn.execute(query).scalar_one()
+
+    def page(self, page=1, per_page=50, newest_first=False):
+        """Страница записей (page с 1) и общее число записей."""
+        order = absences.c.id.desc() if newest_first else absences.c.id
+        query = select(absences).order_by(order).limit(per_page).offset((page - 1) * per_page)
+        with self.engine.connect() as conn:
+            rows = conn.execute(query).all()
+        return [_record(row) for row in rows], self.count()
+
+    def records(self):
+        """Все записи по порядку добавления."""
+        with self.engine.connect() as conn:
+            return [_record(row) for row in conn.execute(select(absences).order_by(absences.c.id))]
+
+    # -------------------------------------------------------------------------
+    # Запись
+    # -------------------------------------------------------------------------
+
+    def add(self, tab_no, shift, day, reason=""):
+        """Добавляет запись, возвращает её id."""
+        with self.engine.begin() as conn:
+            result = conn.execute(insert(absences).values(
+                tab_no=str(tab_no).strip(),
+                shift=int(shift),
+                day=int(day),
+                reason=str(reason),
+                created_at=datetime.utcnow(),
+            ))
+            return result.inserted_primary_key[0]
+
+    def delete(self, absence_id):
+        """Удаляет запись по id; возвращает удалённую запись или None."""
+        with self.engine.begin() as conn:
+            row = conn.execute(select(absences).where(absences.c.id == absence_id)).first()
+            if row is None:
+                return None
+            conn.execute(delete(absences).where(absences.c.id == absence_id))
+            return _record(row)
+
+    def import_json(self, path=None):
+        """Переносит записи из JSON-файла отсутствий; возвращает их число."""
+        path = path or self.json_file
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        rows = []
+        for rec in data if isinstance(data, list) else []:
+            try:
+                rows.append({
+                    "tab_no": str(rec["tab_no"]).strip(),
+                    "shift": int(rec["shift"]),
+                    "day": int(rec["day"]),
+                    "reason": str(rec.get("reason", "")),
+                    "created_at": datetime.utcnow(),
+                })
+            except (KeyError, TypeError, ValueError):
+                continue
+
+        if rows:
+            with self.engine.begin() as conn:
+                conn.execute(insert(absences), rows)
+        print(f"[INFO] Импортировано отсутствий из {path}: {len(rows)}")
+        return len(rows)
+
+
+absence_store = AbsenceStore()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Хранилище отсутствий (SQLite)")
+    parser.add_argument("--import", dest="import_file", nargs="?", const=ABSENCES_FILE,
+                        metavar="FILE", help="перенести записи из JSON (по умолчанию ABSENCES_FILE)")
+    args = parser.parse_args()
+
+    # Без автоимпорта при создании базы: файл переносится только явно
+    store = AbsenceStore(json_file=None)
+    if args.import_file:
+        store.import_json(args.import_file)
+    print(f"[INFO] Записей в {store.path}: {store.count()}")
@@ -0,0 +1,134 @@
+"""
+Оптимальное назначение водителей на слоты маршрута (режим --mode=optimal).
+
+Жадный планировщик идёт по слотам сверху вниз, и ранний слот может забрать
+водителя, который был единственным вариантом для более позднего. Здесь обе
+смены решаются совместно как задача о назначениях минимальной стоимости
+(венгерский алгоритм, реализован в проекте, без внешних зависимостей).
+
+Стоимость пары (слот, водитель) строится из тех же критериев, что в
+жадном выборе (scoring.CandidatePool.choose): |отдых - REST_HOURS| + штраф
+за ту же смену; отрицательный
+отдых или отсутствие в эту смену — недопустимая пара.
+"""
+import numpy as np
+
+from structure_model.config import (
+    REST_HOURS,
+    SAME_SHIFT_PENALTY_HOURS,
+    EXTRA_WORK_PENALTY_HOURS,
+)
+
+# Стоимость непокрытого слота: больше суммы любых допустимых стоимостей,
+# поэтому сначала максимизируется число покрытых слотов, потом качество отдыха.
+UNCOVERED_COST = 1e7
+
+
+def linear_sum_assignment(cost):
+    """
+    Венгерский алгоритм (вариант с потенциалами, O(n^2 * m)).
+
+    cost — матрица n x m. Возвращает (rows, cols): каждой строке из rows
+    сопоставлен столбец из cols, суммарная стоимость минимальна.
+    При n > m решается транспонированная задача.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.size == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+
+    # Индексация с 1, столбец 0 — фиктивный корень дерева чередующихся путей
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)    # p[j] — строка, занявшая столбец j
+    way = np.zeros(m + 1, dtype=np.int64)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+
+            free = ~used[1:]
+            cur = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (cur < minv[1:])
+            minv[1:][better] = cur[better]
+            way[1:][better] = j0
+
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+
+            j0 = j1
+            if p[j0] == 0:
+                break
+
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    cols = np.flatnonzero(p[1:])
+    rows = p[1:][cols] - 1
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+def build_cost_matrix(pool, slots, allowed, fallback=None):
+    """
+    Матрица стоимостей слоты x водители пула и позиции водителей столбцов
+    в общем индексе (в порядке табельных).
+
+    slots — [(shift, start_min), ...], allowed — {shift: маска кандидатов},
+    fallback — маска водителей, которых можно вызвать сверх плана
+    (ALLOW_WEEKEND_EXTRA_WORK) с дополнительным штрафом.
+    """
+    cols = pool.columns()
+    cost = np.full((len(slots), len(cols)), UNCOVERED_COST)
+    free = ~pool.assigned[cols]
+    has_history = pool.has_history[cols]
+    shift_code = pool.shift_code[cols]
+    pool.scanned += len(slots) * len(cols)
+
+    for row, (shift, start_min) in enumerate(slots):
+        rest = pool.rest_hours(cols, start_min)
+        base = np.abs(rest - REST_HOURS)
+        base += SAME_SHIFT_PENALTY_HOURS * (has_history & (shift_code == shift))
+        feasible = rest >= 0
+
+        ok = feasible & free & allowed[shift][cols]
+        cost[row, ok] = base[ok]
+
+        if fallback is not None:
+            extra = feasible & free & fallback[cols] & ~allowed[shift][cols]
+            cost[row, extra] = base[extra] + EXTRA_WORK_PENALTY_HOURS
+
+    return cost, cols
+
+
+def assign_optimal(pool, slots, allowed, fallback=None):
+    """
+    Совместное назначение обеих смен. Возвращает табельный (или None) для
+    каждого слота в порядке slots и помечает выбранных как назначенных в пуле.
+    """
+    cost, cols = build_cost_matrix(pool, slots, allowed, fallback)
+    chosen = [None] * len(slots)
+    for row, col in zip(*linear_sum_assignment(cost)):
+        if cost[row, col] < UNCOVERED_COST:
+            chosen[row] = pool.driver_index.tab_no[cols[col]]
+            pool.assign(chosen[row])
+    return chosen
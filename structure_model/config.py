@@ -7,18 +7,24 @@ from pathlib import Path
 # Базовый каталог проекта — один источник правды
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-# Excel-файл с шаблонами расписаний
+# Excel-файлы с шаблонами расписаний: трамваи (и общий табель) / троллейбусы
 FILE_PATH = BASE_DIR / "data" / "data.xlsx"
+FILE_PATH_OBUS = BASE_DIR / "data" / "data_obus.xlsx"
 
 # Директории
 HISTORY_JSON_DIR = BASE_DIR / "history_json"
 OUTPUT_DIR_TRAM = BASE_DIR / "output"        # трамваи
 OUTPUT_DIR_OBUS = BASE_DIR / "output_obus"   # троллейбусы
+OUTPUT_DIR = OUTPUT_DIR_TRAM                 # общие отчёты (нагрузка, сводка)
+
+# Скомпилированные кэши (пересобираются автоматически, в git не хранятся)
+CACHE_DIR = BASE_DIR / "cache"
 
 # Создаём каталоги
 HISTORY_JSON_DIR.mkdir(parents=True, exist_ok=True)
 OUTPUT_DIR_TRAM.mkdir(parents=True, exist_ok=True)
 OUTPUT_DIR_OBUS.mkdir(parents=True, exist_ok=True)
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
 # =============================================================================
 # ПАРАМЕТРЫ EXCEL
@@ -37,6 +43,9 @@ COL_SHIFT_2_END = 11
 
 TAB_SHEET_NAME = "Весь_табель"
 
+# (route, is_weekend) -> лист; заполняет routes_sync.sync_routes (legacy)
+SCHEDULE_SHEETS = {}
+
 # Код выходного дня в табеле
 WEEKEND_CODE = "В"
 
@@ -50,8 +59,35 @@ REST_HOURS = 12.0
 # Разрешать ли вызывать водителей в выходной
 ALLOW_WEEKEND_EXTRA_WORK = False
 
-# Файл реальных отсутствий
+# Режим назначения по умолчанию: "greedy" (по порядку слотов) или "optimal"
+PLANNER_MODE = "greedy"
+
+# Процессов для маршрутов одного дня (--workers); 1 — последовательно
+PLANNER_WORKERS = 1
+
+# Режим optimal: штрафы в часах отклонения от REST_HOURS
+SAME_SHIFT_PENALTY_HOURS = 1.0     # та же смена, что вчера
+EXTRA_WORK_PENALTY_HOURS = 100.0   # вызов сверх плана (ALLOW_WEEKEND_EXTRA_WORK)
+
+# Реальные отсутствия: база SQLite (absence_store) и прежний JSON для импорта
+ABSENCES_DB = str(BASE_DIR / "absences.db")
 ABSENCES_FILE = str(BASE_DIR / "real_absences.json")
+ABSENCES_PAGE_SIZE = 50    # /get-real-absences: записей на страницу по умолчанию
+ABSENCES_PAGE_MAX = 500
+
+# Фоновые пересчёты из веб-интерфейса: планировщик пишет общие файлы,
+# поэтому задачи выполняются по одной
+JOB_WORKERS = 1
+JOB_HISTORY_LIMIT = 200   # сколько завершённых задач хранить для /api/jobs
+
+# Сколько ответов /api/schedule держать в памяти (LRU)
+SCHEDULE_CACHE_SIZE = 64
+
+# Закрепления (consolidation): как часто сверять mtime файлов, секунд
+ROSTER_CHECK_INTERVAL = 5.0
+
+# Сводный отчёт: строки водителей считаются и пишутся порциями такого размера
+REPORT_CHUNK_SIZE = 500
 
 # =============================================================================
 # КОНФИГУРАЦИЯ ТРАНСПОРТА
@@ -60,6 +96,7 @@ ABSENCES_FILE = str(BASE_DIR / "real_absences.json")
 # - никаких диапазонов "на глаз"
 # - маршруты задаются ЯВНО
 # - поддерживаются строковые номера (например "93тб")
+# - листы маршрутов берутся из книги своего транспорта ("file")
 # =============================================================================
 
 TRANSPORTS = {
@@ -68,6 +105,7 @@ TRANSPORTS = {
     # -------------------------------------------------------------------------
     "tram": {
         "output_dir": OUTPUT_DIR_TRAM,
+        "file": FILE_PATH,   # книга с листами "sheets"
 
         # ⚠️ ВАЖНО:
         # здесь укажи РЕАЛЬНЫЕ трамвайные маршруты
@@ -110,6 +148,7 @@ TRANSPORTS = {
     # -------------------------------------------------------------------------
     "obus": {
         "output_dir": OUTPUT_DIR_OBUS,
+        "file": FILE_PATH_OBUS,
 
         # ЯВНЫЕ СПИСКИ МАРШРУТОВ
         "routes": {
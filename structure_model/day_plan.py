@@ -0,0 +1,71 @@
+"""
+Машиночитаемая копия итогового расписания маршрута на день.
+
+Рядом с Расписание_Итог_{day}.xlsx планировщик пишет Расписание_Итог_{day}.json:
+слоты (строка Excel, смена, начало и конец в минутах, табельный) и
+сведения о маршруте. API и календарь читают этот файл, а Excel остаётся
+выгрузкой для людей. Для дней, спланированных до появления файла,
+сервер по-прежнему читает Excel.
+
+Формат (компактный JSON):
+    {"transport": ..., "route": ..., "day": ..., "sheet_name": ...,
+     "columns": ["excel_row", "shift", "start_min", "end_min", "tab_no"],
+     "slots": [[5, 1, 310, 800, "10025"], [7, 2, 900, 1460, null], ...]}
+tab_no = null — слот остался без водителя (НЕТ_РЕЗЕРВА).
+"""
+import json
+import re
+
+from structure_model.utils import atomic_write
+
+PLAN_COLUMNS = ["excel_row", "shift", "start_min", "end_min", "tab_no"]
+
+_PLAN_NAME_RE = re.compile(r"^Расписание_Итог_(\d+)\.(?:json|xlsx)$")
+
+
+def plan_path(route_dir, day):
+    return route_dir / f"Расписание_Итог_{day}.json"
+
+
+def planned_day(filename):
+    """День по имени итогового файла (json или xlsx) или None."""
+    match = _PLAN_NAME_RE.match(filename)
+    return int(match.group(1)) if match else None
+
+
+def write_day_plan(path, transport, route, day, sheet_name, slots, chosen):
+    """
+    slots — кортежи (excel_row, start_min, end_min, duration, shift),
+    chosen — табельные по слотам (None — не назначен).
+    """
+    data = {
+        "transport": transport,
+        "route": route,
+        "day": day,
+        "sheet_name": sheet_name,
+        "columns": PLAN_COLUMNS,
+        "slots": [
+            [excel_row, shift, start_min, end_min, drv or None]
+            for (excel_row, start_min, end_min, _, shift), drv in zip(slots, chosen)
+        ],
+    }
+    with atomic_write(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def read_day_plan(path):
+    """Содержимое файла или None, если его нет или он повреждён."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def plan_drivers(plan):
+    """Табельные по сменам: ({строка Excel: tab_no}, {строка Excel: tab_no})."""
+    by_shift = {1: {}, 2: {}}
+    for excel_row, shift, _, _, tab_no in plan["slots"]:
+        if tab_no:
+            by_shift.setdefault(shift, {})[excel_row] = tab_no
+    return by_shift[1], by_shift[2]
@@ -0,0 +1,91 @@
+"""
+Плотный индекс водителей: табельный <-> номер позиции.
+
+Наборы водителей (закрепления, отсутствия, «назначен сегодня», кандидаты
+смены) представляются булевыми масками длины len(index), и объединение,
+разность и фильтрация становятся операциями над целыми векторами.
+
+Позиции выдаются в порядке добавления, поэтому новые водители (изменилось
+закрепление) просто дописываются в конец; порядок по табельному, нужный для
+тай-брейка, хранится отдельно в rank.
+"""
+import threading
+
+import numpy as np
+
+from structure_model.timesheet import get_timesheet
+
+
+class DriverIndex:
+    def __init__(self, tab_nos=()):
+        self.tab_no = []
+        self.index = {}
+        self._rank = None
+        self._lock = threading.Lock()
+        self.add(tab_nos)
+
+    def __len__(self):
+        return len(self.tab_no)
+
+    def __contains__(self, tab_no):
+        return tab_no in self.index
+
+    def add(self, tab_nos):
+        """Дописывает неизвестных водителей в конец индекса."""
+        new = [t for t in dict.fromkeys(tab_nos) if t is not None and t not in self.index]
+        if new:
+            with self._lock:
+                for t in new:
+                    if t not in self.index:
+                        self.index[t] = len(self.tab_no)
+                        self.tab_no.append(t)
+                self._rank = None
+        return self
+
+    @property
+    def rank(self):
+        """Место каждого водителя при сортировке по табельному."""
+        rank = self._rank
+        if rank is None or len(rank) != len(self.tab_no):
+            order = np.argsort(np.array(self.tab_no, dtype=str), kind="stable")
+            rank = np.empty(len(order), dtype=np.int64)
+            rank[order] = np.arange(len(order))
+            self._rank = rank
+        return rank
+
+    def mask(self, tab_nos):
+        """Маска набора табельных (неизвестные игнорируются)."""
+        out = np.zeros(len(self.tab_no), dtype=bool)
+        idx = [self.index[t] for t in tab_nos if t in self.index]
+        out[idx] = True
+        return out
+
+    def ordered(self, mask):
+        """Позиции из маски в порядке табельных номеров."""
+        idx = np.flatnonzero(mask)
+        return idx[np.argsort(self.rank[idx], kind="stable")]
+
+    def tab_nos(self, mask):
+        """Табельные из маски в порядке табельных номеров."""
+        return [self.tab_no[i] for i in self.ordered(mask)]
+
+
+_driver_index = None
+_driver_index_lock = threading.Lock()
+
+
+def get_driver_index():
+    """
+    Общий индекс процесса. Создаётся по табелю; водителей закреплений
+    дописывает roster.RosterRegistry при чтении consolidation.
+    """
+    global _driver_index
+    with _driver_index_lock:
+        if _driver_index is None:
+            index = DriverIndex()
+            try:
+                index.add(get_timesheet().tab_no)
+            except Exception as e:
+                print(f"[WARN] Табель недоступен для индекса водителей: {e}")
+            _driver_index = index
+        return _driver_index
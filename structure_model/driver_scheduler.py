@@ -1,218 +1,447 @@
-from datetime import datetime, timedelta
-from openpyxl import load_workbook
-import json
-from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import argparse
+import sys
+
+import numpy as np
 
 from structure_model.config import (
-    BASE_DIR,
-    FILE_PATH,
-    ROW_START,
-    STEP,
-    COL_SHIFT_1_START,
-    COL_SHIFT_1_END,
-    COL_SHIFT_2_START,
-    COL_SHIFT_2_END,
     COL_SHIFT_1_INSERT,
     COL_SHIFT_2_INSERT,
-    REST_HOURS,
     ALLOW_WEEKEND_EXTRA_WORK,
-    ABSENCES_FILE,
     TOTAL_DAYS_IN_MONTH,
     TRANSPORTS,
+    PLANNER_MODE,
+    PLANNER_WORKERS,
 )
 
-from structure_model.excel_io import get_schedule_slots
+from structure_model.absence_store import absence_store
+from structure_model.day_plan import plan_path, write_day_plan
+from structure_model.excel_io import read_slot_table
 from structure_model.history_manager import load_history, save_history
+from structure_model.output_manifest import output_manifest
+from structure_model.output_writer import get_route_template, write_route_schedule
+from structure_model.driver_index import get_driver_index
+from structure_model.response_cache import schedule_cache
+from structure_model.roster import roster_registry
+from structure_model.profiling import cprofile, profiler
+from structure_model.sheet_catalog import sheet_names, validate_transport_sheets
+from structure_model.scoring import CandidatePool, assign_greedy
+from structure_model.shift_parser import ShiftTime
+from structure_model.assignment import assign_optimal
 
 
 # =============================================================================
 # ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ
 # =============================================================================
 
-def load_absent_drivers(day: int, shift: int) -> set[str]:
-    if not ABSENCES_FILE or not Path(ABSENCES_FILE).exists():
-        return set()
-
-    try:
-        with open(ABSENCES_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception:
-        return set()
-
-    absent = set()
-    for rec in data:
-        try:
-            if int(rec["day"]) == day and int(rec["shift"]) == shift:
-                absent.add(str(rec["tab_no"]).strip())
-        except Exception:
-            continue
-
-    return absent
+def load_absent_drivers(day: int, shift: int) -> frozenset[str]:
+    return absence_store.absent(day, shift)
 
 
-def get_rest_hours(driver_id, history, target_start):
-    drv = str(driver_id)
-    if drv not in history:
-        return REST_HOURS
+# =============================================================================
+# ОСНОВНОЙ ПЛАНИРОВЩИК
+# =============================================================================
 
-    last = history[drv]
-    try:
-        h, m = map(int, last["end_str"].split(":"))
-        base_date = target_start.date() - timedelta(days=1)
-        if last.get("is_next_day"):
-            base_date += timedelta(days=1)
+def _is_weekend(day: int) -> bool:
+    now = datetime.now()
+    return datetime(now.year, now.month, day).weekday() >= 5
 
-        last_end = datetime.combine(base_date, datetime.min.time()).replace(hour=h, minute=m)
-        return (target_start - last_end).total_seconds() / 3600
-    except Exception:
-        return -9999
 
+def routes_for_day(transport: str, day: int) -> list[str]:
+    """Маршруты транспорта, которые работают в этот день (будни/выходные)."""
+    day_type = "weekend" if _is_weekend(day) else "workday"
+    return TRANSPORTS[transport]["routes"][day_type]
 
-def worked_same_shift_yesterday(driver_id, history, shift):
-    drv = str(driver_id)
-    return drv in history and history[drv].get("shift_code") == shift
 
+def load_route_drivers(transport: str, route: str) -> set[str]:
+    return set(roster_registry.drivers(transport, route))
 
-def choose_driver(candidates, history, shift_start, shift, assigned_today):
-    scored = []
 
-    for drv in candidates:
-        if drv in assigned_today:
-            continue
+def _load_route(transport: str, route: str, is_weekend: bool, day=None):
+    """Лист, водители и слоты маршрута или None, если планировать нечего."""
+    cfg = TRANSPORTS[transport]
+    sheet_name = cfg["sheets"].get((route, is_weekend))
+    if not sheet_name:
+        print(f"[SKIP] Нет листа (route={route}, weekend={is_weekend})")
+        return None
+    file_path = cfg["file"]
+    if sheet_name not in sheet_names(file_path):
+        print(f"[SKIP] Листа {sheet_name} нет в книге (route={route})")
+        return None
 
-        rest = get_rest_hours(drv, history, shift_start)
-        if rest < 0:
-            continue
+    print(f"[INFO] Маршрут {route}, Excel-лист: {sheet_name}")
 
-        same_shift_penalty = 1 if worked_same_shift_yesterday(drv, history, shift) else 0
-        scored.append((abs(rest - REST_HOURS), same_shift_penalty, -rest, drv))
+    # --- slots (обе смены за одно чтение листа) ---
+    with profiler.span("get_slots", day, transport, route):
+        slots = read_slot_table(file_path, sheet_name)
 
-    if not scored:
+    # --- consolidation ---
+    with profiler.span("load_roster", day, transport, route):
+        drivers = load_route_drivers(transport, route)
+    if not drivers:
+        print("[ERROR] Пустой список водителей")
         return None
 
-    scored.sort()
-    return scored[0][3]
+    print(f"[INFO] Водителей: {len(drivers)}")
 
+    return {
+        "route": route,
+        "file": file_path,
+        "sheet_name": sheet_name,
+        "drivers": drivers,
+        "slots": slots,
+    }
 
-# =============================================================================
-# ОСНОВНОЙ ПЛАНИРОВЩИК
-# =============================================================================
 
-def run_planner(day: int, prev_day: int, transport: str, route: str):
-    print("\n" + "=" * 80)
-    print(f"[RUN] day={day}, transport={transport}, route={route}")
+def _plan_routes(day: int, prev_day: int, transport: str, routes, mode: str, busy=(), progress=None):
+    """
+    Планирует набор маршрутов одного транспорта на день: общий пул кандидатов
+    и единое «назначен сегодня», так что водитель из нескольких закреплений
+    не попадёт на два маршрута сразу. busy — водители, уже занятые сегодня
+    на маршрутах вне набора. progress(transport, route) вызывается после
+    записи каждого маршрута.
 
-    now = datetime.now()
+    Возвращает (история дня, записанные маршруты) или None.
+    """
     try:
-        target_date = datetime(now.year, now.month, day)
+        is_weekend = _is_weekend(day)
     except ValueError:
         print("[ERROR] Некорректный день")
-        return
+        return None
 
-    is_weekend = target_date.weekday() >= 5
+    loaded = [r for r in (_load_route(transport, route, is_weekend, day) for route in routes) if r]
+    if not loaded:
+        return None
 
-    cfg = TRANSPORTS[transport]
-    sheets = cfg["sheets"]
-    output_root = cfg["output_dir"]
+    with profiler.span("load_history", day, transport):
+        history = load_history(prev_day)
 
-    sheet_name = sheets.get((route, is_weekend))
-    if not sheet_name:
-        print(f"[SKIP] Нет листа (route={route}, weekend={is_weekend})")
-        return
+    # --- absences ---
+    with profiler.span("load_absences", day, transport):
+        absent = {1: load_absent_drivers(day, 1), 2: load_absent_drivers(day, 2)}
 
-    print(f"[INFO] Excel-лист: {sheet_name}")
+    today_history, plans = _assign_routes(day, transport, loaded, history, absent, mode, busy)
+    return today_history, _write_routes(day, transport, plans, progress)
 
-    history = load_history(prev_day)
-    today_history = {}
 
-    # --- slots ---
-    slots_s1 = get_schedule_slots(
-        FILE_PATH, ROW_START, STEP,
-        COL_SHIFT_1_START, COL_SHIFT_1_END, 1, sheet_name
-    )
-    slots_s2 = get_schedule_slots(
-        FILE_PATH, ROW_START, STEP,
-        COL_SHIFT_2_START, COL_SHIFT_2_END, 2, sheet_name
-    )
+def _assign_routes(day, transport, loaded, history, absent, mode, busy=()):
+    """
+    Назначение по уже загруженным маршрутам (см. _plan_routes), без записи.
+    Возвращает (история дня, планы маршрутов для _write_routes).
+    """
+    # Закрепления — готовые маски реестра по общему индексу: пул — их OR
+    index = get_driver_index()
+    rosters = roster_registry.masks(transport, [r["route"] for r in loaded])
+    everyone = np.logical_or.reduce(rosters)
 
-    # --- consolidation ---
-    cons_path = BASE_DIR / "consolidation" / transport / route / "data.json"
-    if not cons_path.exists():
-        print(f"[ERROR] Нет consolidation: {cons_path}")
-        return
+    pool = CandidatePool(index, everyone, history)
+    greedy_pool = CandidatePool(index, everyone, history) if mode == "optimal" else None
+    busy_mask = index.mask(busy)
+    pool.assign_mask(busy_mask)
+    if greedy_pool is not None:
+        greedy_pool.assign_mask(busy_mask)
 
-    with open(cons_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    # Наборы водителей — маски по общему индексу
+    absent_mask = {shift: index.mask(absent[shift]) for shift in (1, 2)}
 
-    drivers = {
-        str(e["tab_number"]).strip()
-        for e in data.get("employees", [])
-        if e.get("tab_number") is not None
-    }
+    today_history = {}
+    plans = []
+
+    for r, roster in zip(loaded, rosters):
+        allowed = {shift: roster & ~absent_mask[shift] for shift in (1, 2)}
+        fallback = roster if ALLOW_WEEKEND_EXTRA_WORK else None
+
+        # --- assignment ---
+        slots = r["slots"].tolist()   # (excel_row, start_min, end_min, duration, shift)
+        slot_keys = [(shift, start_min) for _, start_min, _, _, shift in slots]
+        scanned = pool.scanned
+
+        with profiler.span("assignment", day, transport, r["route"]):
+            if mode == "optimal":
+                chosen = assign_optimal(pool, slot_keys, allowed, fallback)
+                greedy = assign_greedy(greedy_pool, slot_keys, allowed, fallback)
+                missing_greedy = greedy.count(None)
+                missing_optimal = chosen.count(None)
+                print(
+                    f"[OPTIMAL] НЕТ_РЕЗЕРВА: greedy={missing_greedy}, optimal={missing_optimal} "
+                    f"(устранено {missing_greedy - missing_optimal})"
+                )
+            else:
+                chosen = assign_greedy(pool, slot_keys, allowed, fallback)
+
+        profiler.count(
+            day, transport, r["route"],
+            slots=len(slots), candidates=pool.scanned - scanned, no_reserve=chosen.count(None),
+        )
+
+        stamps = []
+        assigned = 0
+        for (excel_row, start_min, end_min, _, shift), drv in zip(slots, chosen):
+            col = COL_SHIFT_1_INSERT if shift == 1 else COL_SHIFT_2_INSERT
+            stamps.append((excel_row, col, drv or "НЕТ_РЕЗЕРВА"))
+            if drv:
+                today_history[drv] = {
+                    "time": ShiftTime(start_min, end_min),
+                    "shift_code": shift,
+                    "transport": transport,
+                    "route": r["route"],
+                }
+                assigned += 1
+
+        plans.append({**r, "slots": slots, "chosen": chosen, "stamps": stamps, "assigned": assigned})
+
+    return today_history, plans
+
+
+def _write_routes(day, transport, plans, progress=None):
+    """
+    Запись Расписание_Итог и JSON-копий по планам _assign_routes.
+    progress(transport, route) вызывается после каждого маршрута.
+    Возвращает записанные маршруты.
+    """
+    output_root = TRANSPORTS[transport]["output_dir"]
+    for p in plans:
+        route_dir = output_root / p["route"]
+        route_dir.mkdir(parents=True, exist_ok=True)
+        out_file = route_dir / f"Расписание_Итог_{day}.xlsx"
+
+        with profiler.span("write", day, transport, p["route"]):
+            write_route_schedule(out_file, p["sheet_name"], p["stamps"], p["file"])
+            write_day_plan(plan_path(route_dir, day), transport, p["route"], day, p["sheet_name"],
+                           p["slots"], p["chosen"])
+        schedule_cache.invalidate(transport, p["route"], day)
+        print(f"[DONE] {out_file} | назначено: {p['assigned']}")
+        if progress is not None:
+            progress(transport, p["route"])
+
+    return [p["route"] for p in plans]
+
+
+def run_planner(day: int, prev_day: int, transport: str, route: str, mode: str = PLANNER_MODE):
+    print("\n" + "=" * 80)
+    print(f"[RUN] day={day}, transport={transport}, route={route}, mode={mode}")
 
-    if not drivers:
-        print("[ERROR] Пустой список водителей")
+    result = _plan_routes(day, prev_day, transport, [route], mode)
+    if result is None:
         return
 
-    print(f"[INFO] Водителей: {len(drivers)}")
-
-    # --- absences ---
-    absent_s1 = load_absent_drivers(day, 1)
-    absent_s2 = load_absent_drivers(day, 2)
-
-    cand_s1 = drivers - absent_s1
-    cand_s2 = drivers - absent_s2
-
-    # --- output ---
-    route_dir = output_root / route
-    route_dir.mkdir(parents=True, exist_ok=True)
-    out_file = route_dir / f"Расписание_Итог_{day}.xlsx"
+    today_history, written = result
+    with profiler.span("save_history", day, transport):
+        save_history(day, today_history, transport, routes=[route])
+    output_manifest.record(transport, day, written)
+
+
+def replan_routes(day: int, transport: str, routes, mode: str = PLANNER_MODE, progress=None):
+    """
+    Перепланирует только указанные маршруты дня. Водители, которые по истории
+    дня уже работают на других маршрутах, в пул не попадают.
+    Возвращает историю дня по этим маршрутам.
+    """
+    routes = [str(r) for r in routes]
+    history = load_history(day)
+
+    # В старой истории (history_{day}.json) нет транспорта и маршрута: занятых
+    # на других маршрутах не отличить от своих, поэтому день считается заново.
+    # Так же для дня без истории: иначе в ней остались бы только эти маршруты
+    if not history or any(not rec.get("transport") or not rec.get("route") for rec in history.values()):
+        print(f"[INFO] День {day}: в истории нет маршрутов — полный пересчёт дня")
+        _replan_full_day(day, mode, progress)
+        return {
+            drv: rec for drv, rec in load_history(day).items()
+            if rec["transport"] == transport and rec["route"] in routes
+        }
+
+    own = {(transport, r) for r in routes}
+    busy = {drv for drv, rec in history.items() if (rec["transport"], rec["route"]) not in own}
+
+    result = _plan_routes(day, max(day - 1, 0), transport, routes, mode, busy=busy, progress=progress)
+    if result is None:
+        return {}
+
+    today_history, written = result
+    with profiler.span("save_history", day, transport):
+        save_history(day, today_history, transport, routes=routes)
+    output_manifest.record(transport, day, written)
+    return today_history
+
+
+def _replan_full_day(day: int, mode: str, progress=None):
+    """
+    Все транспорты дня заново; история дня перезаписывается целиком
+    (как при последовательном plan_days: позже спланированный транспорт
+    побеждает при совпадении табельных). Сначала листы читаются и назначения
+    считаются для всех транспортов, и только потом пишутся файлы и история —
+    ошибка чтения или расчёта не оставит день пересчитанным наполовину.
+    """
+    try:
+        is_weekend = _is_weekend(day)
+    except ValueError:
+        print("[ERROR] Некорректный день")
+        return
 
-    wb = load_workbook(FILE_PATH)
-    for sh in wb.sheetnames[:]:
-        if sh != sheet_name:
-            del wb[sh]
+    with profiler.span("load_history", day):
+        history = load_history(max(day - 1, 0))
+    with profiler.span("load_absences", day):
+        absent = {1: load_absent_drivers(day, 1), 2: load_absent_drivers(day, 2)}
+
+    planned = []
+    for transport in TRANSPORTS:
+        routes = routes_for_day(transport, day)
+        loaded = [r for r in (_load_route(transport, route, is_weekend, day) for route in routes) if r]
+        if loaded:
+            planned.append((transport, *_assign_routes(day, transport, loaded, history, absent, mode)))
+
+    merged = {}
+    for transport, today_history, plans in planned:
+        written = _write_routes(day, transport, plans, progress)
+        merged.update(today_history)
+        output_manifest.record(transport, day, written)
+
+    with profiler.span("save_history", day):
+        save_history(day, merged)
+
+
+def plan_day(day: int, transport: str, mode: str = PLANNER_MODE, progress=None):
+    """
+    Планирование всех маршрутов транспорта на день за один проход:
+    история, отсутствия и листы читаются один раз, кандидаты общие.
+    """
+    print("\n" + "=" * 80)
+    print(f"[RUN] day={day}, transport={transport}, все маршруты, mode={mode}")
 
-    ws = wb[sheet_name]
-    ws.title = "Расписание"
+    try:
+        routes = routes_for_day(transport, day)
+    except ValueError:
+        print("[ERROR] Некорректный день")
+        return
 
-    for s in slots_s1:
-        ws.cell(s["excel_row"], COL_SHIFT_1_INSERT).value = None
-    for s in slots_s2:
-        ws.cell(s["excel_row"], COL_SHIFT_2_INSERT).value = None
+    result = _plan_routes(day, max(day - 1, 0), transport, routes, mode, progress=progress)
+    if result is None:
+        return
 
-    assigned_today = set()
+    # Строки других транспортов за этот день сохраняются
+    today_history, written = result
+    with profiler.span("save_history", day, transport):
+        save_history(day, today_history, transport)
+    output_manifest.record(transport, day, written)
 
-    # --- shift 1 ---
-    for s in slots_s1:
-        drv = choose_driver(cand_s1, history, s["time_info"]["start_dt"], 1, assigned_today)
-        if not drv and ALLOW_WEEKEND_EXTRA_WORK:
-            drv = choose_driver(drivers, history, s["time_info"]["start_dt"], 1, assigned_today)
 
-        ws.cell(s["excel_row"], COL_SHIFT_1_INSERT).value = drv or "НЕТ_РЕЗЕРВА"
-        if drv:
-            assigned_today.add(drv)
-            cand_s1.discard(drv)
-            cand_s2.discard(drv)
-            today_history[drv] = {**s["time_info"], "shift_code": 1}
+# =============================================================================
+# ПАРАЛЛЕЛЬНЫЙ ПРОГОН ПО ДНЯМ
+# =============================================================================
 
-    # --- shift 2 ---
-    for s in slots_s2:
-        drv = choose_driver(cand_s2, history, s["time_info"]["start_dt"], 2, assigned_today)
-        if not drv and ALLOW_WEEKEND_EXTRA_WORK:
-            drv = choose_driver(drivers, history, s["time_info"]["start_dt"], 2, assigned_today)
+def _route_groups(loaded):
+    """
+    Разбивает маршруты на группы, связанные общими водителями. Группы не
+    пересекаются по кандидатам, поэтому их можно планировать независимо —
+    результат тот же, что с общим пулом. Порядок маршрутов сохраняется.
+    """
+    groups = []   # [(водители группы, индексы маршрутов)]
+    for i, r in enumerate(loaded):
+        drivers, members = set(r["drivers"]), [i]
+        rest = []
+        for g_drivers, g_members in groups:
+            if g_drivers & drivers:
+                drivers |= g_drivers
+                members += g_members
+            else:
+                rest.append((g_drivers, g_members))
+        groups = rest + [(drivers, members)]
+
+    groups.sort(key=lambda g: min(g[1]))
+    return [[loaded[i] for i in sorted(members)] for _, members in groups]
+
+
+def _plan_group(day, transport, group, history, absent, mode):
+    """
+    Задача воркера: группа маршрутов с уже разобранными слотами.
+    Возвращает (история, маршруты, замеры воркера по этой группе).
+    """
+    profiler.reset()
+    today_history, plans = _assign_routes(day, transport, group, history, absent, mode)
+    written = _write_routes(day, transport, plans)
+    return today_history, written, profiler.snapshot()
+
+
+def _plan_day_parallel(executor, day, mode, route_cache):
+    """
+    Один день всех транспортов: группы маршрутов уходят в пул процессов,
+    история сохраняется после завершения всех групп (барьер перед следующим днём).
+    """
+    print("\n" + "=" * 80)
+    print(f"[RUN] day={day}, все транспорты, mode={mode}")
 
-        ws.cell(s["excel_row"], COL_SHIFT_2_INSERT).value = drv or "НЕТ_РЕЗЕРВА"
-        if drv:
-            assigned_today.add(drv)
-            cand_s2.discard(drv)
-            cand_s1.discard(drv)
-            today_history[drv] = {**s["time_info"], "shift_code": 2}
+    try:
+        is_weekend = _is_weekend(day)
+    except ValueError:
+        print("[ERROR] Некорректный день")
+        return
 
-    wb.save(out_file)
-    save_history(day, today_history)
+    with profiler.span("load_history", day):
+        history = load_history(max(day - 1, 0))
+    with profiler.span("load_absences", day):
+        absent = {1: load_absent_drivers(day, 1), 2: load_absent_drivers(day, 2)}
+
+    futures = {}
+    for transport in TRANSPORTS:
+        loaded = []
+        for route in routes_for_day(transport, day):
+            key = (transport, route, is_weekend)
+            if key not in route_cache:
+                route_cache[key] = _load_route(transport, route, is_weekend, day)
+            if route_cache[key]:
+                loaded.append(route_cache[key])
+        if not loaded:
+            continue
 
-    print(f"[DONE] {out_file} | назначено: {len(today_history)}")
+        futures[transport] = []
+        for group in _route_groups(loaded):
+            # Шаблоны извлекаются здесь, воркеры только читают их из кэша
+            for r in group:
+                get_route_template(r["sheet_name"], r["file"])
+            futures[transport].append(
+                executor.submit(_plan_group, day, transport, group, history, absent, mode)
+            )
+
+    # Слияние в порядке маршрутов — как при последовательном plan_day
+    for transport, transport_futures in futures.items():
+        merged, written = {}, []
+        for future in transport_futures:
+            group_history, group_routes, group_profile = future.result()
+            merged.update(group_history)
+            written += group_routes
+            profiler.merge(group_profile)
+        order = {route: i for i, route in enumerate(routes_for_day(transport, day))}
+        today_history = dict(sorted(merged.items(), key=lambda kv: order[kv[1]["route"]]))
+        with profiler.span("save_history", day, transport):
+            save_history(day, today_history, transport)
+        # Манифест пишет только главный процесс
+        output_manifest.record(transport, day, written)
+
+
+def plan_days(days, mode: str = PLANNER_MODE, workers: int = PLANNER_WORKERS):
+    """
+    Планирование дней по порядку для всех транспортов. При workers > 1
+    маршруты дня считаются в пуле процессов; дни остаются последовательными,
+    т.к. отдых зависит от истории предыдущего дня.
+    Маршруты, листов которых нет в книге, пропускаются; возвращает False,
+    если такие были (CLI тогда завершается с кодом 1).
+    """
+    sheets_ok = validate_transport_sheets()
+    roster_registry.invalidate()
+
+    if workers <= 1:
+        for day in days:
+            for transport in TRANSPORTS:
+                plan_day(day, transport, mode=mode)
+        return sheets_ok
+
+    route_cache = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for day in days:
+            _plan_day_parallel(executor, day, mode, route_cache)
+    return sheets_ok
 
 
 # =============================================================================
@@ -220,14 +449,20 @@ def run_planner(day: int, prev_day: int, transport: str, route: str):
 # =============================================================================
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Планирование водителей на месяц")
+    parser.add_argument("--mode", choices=("greedy", "optimal"), default=PLANNER_MODE)
+    parser.add_argument("--workers", type=int, default=PLANNER_WORKERS,
+                        help="число процессов для маршрутов одного дня")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="сохранить профиль cProfile (pstats) в FILE")
+    args = parser.parse_args()
+
     for transport, cfg in TRANSPORTS.items():
         for day_type, routes in cfg["routes"].items():
             print(f"[INFO] {transport} / {day_type}: {routes}")
 
-        for day in range(1, TOTAL_DAYS_IN_MONTH + 1):
-            prev = max(day - 1, 0)
-            is_weekend = datetime.now().replace(day=day).weekday() >= 5
-            route_list = cfg["routes"]["weekend" if is_weekend else "workday"]
-
-            for route in route_list:
-                run_planner(day, prev, transport, route)
+    with cprofile(args.profile):
+        sheets_ok = plan_days(range(1, TOTAL_DAYS_IN_MONTH + 1), mode=args.mode, workers=args.workers)
+    print("\n" + profiler.summary_table())
+    if not sheets_ok:
+        sys.exit(1)
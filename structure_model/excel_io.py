@@ -1,72 +1,70 @@
+import numpy as np
 import pandas as pd
-from structure_model.shift_parser import get_shift_info_from_two_cols
-from structure_model.config import ROW_START, STEP, TAB_SHEET_NAME, WEEKEND_CODE
+from structure_model.shift_parser import parse_shift_columns
+from structure_model.config import (
+    ROW_START,
+    STEP,
+    COL_SHIFT_1_START,
+    COL_SHIFT_1_END,
+    COL_SHIFT_2_START,
+    COL_SHIFT_2_END,
+)
+from structure_model.timesheet import get_timesheet
+from structure_model.workbook_cache import get_sheet_columns
 
+# Столбцы (начало, конец) по сменам
+SHIFT_COLUMNS = {
+    1: (COL_SHIFT_1_START, COL_SHIFT_1_END),
+    2: (COL_SHIFT_2_START, COL_SHIFT_2_END),
+}
 
-def get_schedule_slots(file_path, start_row, step, col_start, col_end, shift_code, sheet_name):
+SLOT_DTYPE = np.dtype([
+    ("excel_row", np.int32),
+    ("start_min", np.int16),
+    ("end_min", np.int16),      # с учётом перехода через полночь
+    ("duration", np.float64),   # часы, как ShiftTime.duration
+    ("shift", np.int8),
+])
+
+
+def _read_columns(file_path, sheet_name, columns):
+    """Столбцы листа за одно чтение: из кэша книги или одним read_excel."""
+    cached = get_sheet_columns(file_path, sheet_name, columns)
+    if cached is not None:
+        return cached
     df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
-    slots = []
-    current_row = start_row
-    while True:
-        pd_idx = current_row - 1
-        if pd_idx >= len(df):
-            break
-        start_val = df.iloc[pd_idx, col_start]
-        end_val = df.iloc[pd_idx, col_end]
-        time_info = get_shift_info_from_two_cols(start_val, end_val)
-        if time_info:
-            time_info['shift_code'] = shift_code
-            slots.append({'excel_row': current_row, 'time_info': time_info})
-        current_row += step
-    return slots
+    return len(df), [df.iloc[:, col].tolist() for col in columns]
+
+
+def read_slot_table(file_path, sheet_name, start_row=ROW_START, step=STEP, shifts=SHIFT_COLUMNS):
+    """
+    Слоты листа расписания обеих смен: строки start_row, start_row+step, ...
+    Возвращает массив SLOT_DTYPE — сначала слоты 1-й смены, затем 2-й,
+    каждая в порядке строк.
+    """
+    columns = [col for pair in shifts.values() for col in pair]
+    n_rows, values = _read_columns(file_path, sheet_name, columns)
+    by_col = dict(zip(columns, values))
+
+    rows = np.arange(start_row - 1, n_rows, step)
+    parts = []
+    for shift, (col_start, col_end) in shifts.items():
+        parsed = parse_shift_columns(by_col[col_start][start_row - 1::step], by_col[col_end][start_row - 1::step])
+        valid = parsed["valid"]
+        part = np.zeros(int(valid.sum()), dtype=SLOT_DTYPE)
+        part["excel_row"] = rows[valid] + 1
+        part["start_min"] = parsed["start_min"][valid]
+        part["end_min"] = parsed["end_min"][valid]
+        part["duration"] = np.round((part["end_min"] - part["start_min"]) / 60, 2)
+        part["shift"] = shift
+        parts.append(part)
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=SLOT_DTYPE)
 
 
 def get_available_drivers(file_path, day_num, shift_code):
-    df = pd.read_excel(file_path, sheet_name=TAB_SHEET_NAME)
-    df.columns = df.columns.astype(str)
-    day_col = str(day_num)
-    if day_col not in df.columns:
-        if f'{day_num}.0' in df.columns:
-            day_col = f'{day_num}.0'
-        else:
-            raise ValueError(f"Ошибка: В табеле нет колонки с названием '{day_num}'")
-    drivers = []
-    for _, row in df.iterrows():
-        tab_no = _normalize_tab_no(row.iloc[0])
-        if not tab_no:
-            continue
-        status_clean = str(row[day_col]).strip()
-        if status_clean.startswith(str(shift_code)):
-            drivers.append(tab_no)
-    return drivers
+    return get_timesheet(file_path).drivers_on_shift(day_num, shift_code)
 
 
 def get_weekend_drivers(file_path, day_num):
     """Возвращает табельные водителей, у которых в табеле стоит выходной (код WEEKEND_CODE)."""
-    df = pd.read_excel(file_path, sheet_name=TAB_SHEET_NAME)
-    df.columns = df.columns.astype(str)
-    day_col = str(day_num)
-    if day_col not in df.columns:
-        if f'{day_num}.0' in df.columns:
-            day_col = f'{day_num}.0'
-        else:
-            raise ValueError(f"Ошибка: В табеле нет колонки с названием '{day_num}'")
-    drivers = []
-    for _, row in df.iterrows():
-        tab_no = _normalize_tab_no(row.iloc[0])
-        if not tab_no:
-            continue
-        status_clean = str(row[day_col]).strip().upper()
-        if status_clean.startswith(str(WEEKEND_CODE)):
-            drivers.append(tab_no)
-    return drivers
-
-
-def _normalize_tab_no(value):
-    if pd.isna(value):
-        return None
-    try:
-        return str(int(float(value)))
-    except (ValueError, TypeError):
-        text = str(value).strip()
-        return text or None
+    return get_timesheet(file_path).weekend_drivers(day_num)
@@ -1,22 +1,244 @@
-import os
+"""
+История смен по дням.
+
+Один файл на день — history_{day}.npz со столбцами:
+    tab_no, transport, route, start_min, end_min, duration, is_next_day, shift_code
+(время — минуты от полуночи). Записи хранятся для всего депо с указанием
+маршрута, поэтому пересчёт одного маршрута заменяет только его строки.
+
+load_history/save_history работают со словарём по табельным, где время смены —
+shift_parser.ShiftTime. Старые history_{day}.json читаются, если .npz ещё нет,
+и переводятся командой:
+    python -m structure_model.history_manager migrate [--remove-json]
+"""
+import argparse
 import json
-from structure_model.config import HISTORY_JSON_DIR
-from datetime import datetime
+from pathlib import Path
 
-def load_history(day_num):
-    filename = os.path.join(HISTORY_JSON_DIR, f"history_{day_num}.json")
-    if not os.path.exists(filename):
-        return {}
-    with open(filename, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-
-def save_history(day_num, data):
-    filename = os.path.join(HISTORY_JSON_DIR, f"history_{day_num}.json")
-    clean_data = {
-        k: {key: val for key, val in v.items() if not isinstance(val, datetime)}
-        for k, v in data.items()
+import numpy as np
+
+from structure_model.config import HISTORY_JSON_DIR, TOTAL_DAYS_IN_MONTH
+from structure_model.shift_parser import MINUTES_IN_DAY, ShiftTime
+from structure_model.utils import atomic_write
+
+HISTORY_DTYPES = {
+    "tab_no": np.str_,
+    "transport": np.str_,
+    "route": np.str_,
+    "start_min": np.int16,
+    "end_min": np.int16,
+    "duration": np.float64,
+    "is_next_day": np.bool_,
+    "shift_code": np.int8,
+}
+
+
+# =============================================================================
+# ФАЙЛЫ
+# =============================================================================
+
+def history_file(day_num):
+    return Path(HISTORY_JSON_DIR) / f"history_{day_num}.npz"
+
+
+def legacy_history_file(day_num):
+    return Path(HISTORY_JSON_DIR) / f"history_{day_num}.json"
+
+
+def _empty_table():
+    return {col: np.array([], dtype=dtype) for col, dtype in HISTORY_DTYPES.items()}
+
+
+def _table_from_records(data, transport=""):
+    """Словарь {табельный: запись} -> столбцы."""
+    rows = {col: [] for col in HISTORY_DTYPES}
+    for tab_no, rec in data.items():
+        time = rec.get("time")
+        if time is None:
+            # Запись старого history_{day}.json
+            time = ShiftTime.from_hhmm(rec["start_str"], rec["end_str"], rec.get("is_next_day", False))
+        rows["tab_no"].append(str(tab_no))
+        rows["transport"].append(str(rec.get("transport", transport)))
+        rows["route"].append(str(rec.get("route", "")))
+        rows["start_min"].append(time.start_min)
+        rows["end_min"].append(time.end_min % MINUTES_IN_DAY)
+        rows["duration"].append(time.duration)
+        rows["is_next_day"].append(time.is_next_day)
+        rows["shift_code"].append(rec.get("shift_code") or 0)
+    return {col: np.array(values, dtype=HISTORY_DTYPES[col]) for col, values in rows.items()}
+
+
+def _records_from_table(table):
+    """Столбцы -> словарь {табельный: запись}."""
+    cols = {col: table[col].tolist() for col in HISTORY_DTYPES}
+    return {
+        tab_no: {
+            "time": ShiftTime.from_clock(
+                cols["start_min"][i], cols["end_min"][i], cols["is_next_day"][i]
+            ),
+            "shift_code": cols["shift_code"][i],
+            "transport": cols["transport"][i],
+            "route": cols["route"][i],
+        }
+        for i, tab_no in enumerate(cols["tab_no"])
     }
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(clean_data, f, indent=4, ensure_ascii=False)
-    print(f"[Память] Данные о сменах сохранены в {filename}")
\ No newline at end of file
+
+
+def load_table(day_num):
+    """Столбцы истории за день (пустые, если истории нет)."""
+    path = history_file(day_num)
+    if path.exists():
+        with np.load(path, allow_pickle=False) as npz:
+            return {col: npz[col].astype(dtype) for col, dtype in HISTORY_DTYPES.items()}
+
+    legacy = legacy_history_file(day_num)
+    if legacy.exists():
+        with open(legacy, 'r', encoding='utf-8') as f:
+            return _table_from_records(json.load(f))
+
+    return _empty_table()
+
+
+def _write_table(day_num, table):
+    path = history_file(day_num)
+    with atomic_write(path) as f:
+        np.savez(f, **table)
+    return path
+
+
+# =============================================================================
+# ПРЕЖНИЙ ИНТЕРФЕЙС
+# =============================================================================
+
+def load_history(day_num):
+    return _records_from_table(load_table(day_num))
+
+
+def save_history(day_num, data, transport="", routes=None):
+    """
+    Сохраняет смены дня.
+
+    Если указан transport, заменяются только строки этого транспорта
+    (и маршрутов routes, если они заданы); остальные маршруты сохраняются.
+    Без transport день перезаписывается целиком, как раньше.
+    """
+    new = _table_from_records(data, transport)
+
+    if transport:
+        old = load_table(day_num)
+        replaced = old["transport"] == transport
+        if routes is not None:
+            replaced &= np.isin(old["route"], [str(r) for r in routes])
+        keep = ~replaced & ~np.isin(old["tab_no"], new["tab_no"])
+        new = {col: np.concatenate([old[col][keep], new[col]]) for col in HISTORY_DTYPES}
+
+    filename = _write_table(day_num, new)
+    print(f"[Память] Данные о сменах сохранены в {filename}")
+
+
+def clear_history(days):
+    """Удаляет историю (и .npz, и старые .json) за указанные дни."""
+    for d in days:
+        for path in (history_file(d), legacy_history_file(d)):
+            if path.exists():
+                path.unlink()
+
+
+# =============================================================================
+# МАССОВАЯ ЗАГРУЗКА
+# =============================================================================
+
+class HistoryStore:
+    """
+    История за диапазон дней целиком в памяти.
+
+    Помимо столбцов (с добавленным столбцом day) строится индекс
+    водитель x день, по которому за O(1) находятся смена в конкретный день
+    и последняя смена до заданного дня.
+    """
+
+    def __init__(self, first_day=1, last_day=TOTAL_DAYS_IN_MONTH + 1):
+        self.first_day = first_day
+        self.last_day = last_day
+
+        days = range(first_day, last_day + 1)
+        tables = [load_table(d) for d in days]
+        self.columns = {
+            col: np.concatenate([t[col] for t in tables]) for col in HISTORY_DTYPES
+        }
+        self.columns["day"] = np.concatenate([
+            np.full(len(t["tab_no"]), d, dtype=np.int16) for d, t in zip(days, tables)
+        ])
+
+        self.drivers, driver_idx = np.unique(self.columns["tab_no"], return_inverse=True)
+        self.driver_index = {drv: i for i, drv in enumerate(self.drivers.tolist())}
+
+        n_days = len(days)
+        day_idx = self.columns["day"] - first_day
+        self.row_at = np.full((len(self.drivers), n_days), -1, dtype=np.int64)
+        self.row_at[driver_idx, day_idx] = np.arange(len(day_idx))
+
+        # Индекс последнего дня с работой (<= k) для каждого столбца k
+        worked = np.where(self.row_at >= 0, np.arange(n_days), -1)
+        self._last_worked = np.maximum.accumulate(worked, axis=1)
+
+    def __len__(self):
+        return len(self.columns["tab_no"])
+
+    def _record(self, row):
+        return {col: values[row].item() for col, values in self.columns.items()}
+
+    def shift_on(self, tab_no, day):
+        """Смена водителя в указанный день или None."""
+        i = self.driver_index.get(str(tab_no))
+        k = day - self.first_day
+        if i is None or not 0 <= k < self.row_at.shape[1]:
+            return None
+        row = self.row_at[i, k]
+        return self._record(row) if row >= 0 else None
+
+    def last_shift_before(self, tab_no, day):
+        """Последняя смена водителя строго до дня day или None."""
+        i = self.driver_index.get(str(tab_no))
+        k = min(day - self.first_day, self.row_at.shape[1]) - 1
+        if i is None or k < 0:
+            return None
+        last = self._last_worked[i, k]
+        return self._record(self.row_at[i, last]) if last >= 0 else None
+
+    def day_records(self, day):
+        """Смены дня в прежнем формате {табельный: запись}."""
+        mask = self.columns["day"] == day
+        return _records_from_table({col: self.columns[col][mask] for col in HISTORY_DTYPES})
+
+
+# =============================================================================
+# МИГРАЦИЯ
+# =============================================================================
+
+def migrate_json_history(remove_json=False):
+    """Переводит все history_{day}.json в формат .npz."""
+    migrated = []
+    for legacy in sorted(Path(HISTORY_JSON_DIR).glob("history_*.json")):
+        day_num = legacy.stem.split("_", 1)[1]
+        if not day_num.isdigit():
+            continue
+        with open(legacy, 'r', encoding='utf-8') as f:
+            table = _table_from_records(json.load(f))
+        _write_table(int(day_num), table)
+        if remove_json:
+            legacy.unlink()
+        migrated.append(int(day_num))
+    return sorted(migrated)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Работа с историей смен")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="перевести history_*.json в .npz")
+    migrate.add_argument("--remove-json", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        days = migrate_json_history(remove_json=args.remove_json)
+        print(f"[Память] Переведено дней: {len(days)} ({HISTORY_JSON_DIR})")
@@ -0,0 +1,73 @@
+"""
+Инкрементальный пересчёт после изменения отсутствий.
+
+Вместо перепланирования всех маршрутов дня пересчитываются только маршруты,
+в закреплениях (consolidation) которых есть затронутые водители. Изменение
+дня N меняет отдых перед днём N+1, поэтому пересчёт идёт вперёд по дням:
+на следующий день перепланируются маршруты водителей, чья смена изменилась,
+и процесс останавливается, как только назначения дня перестают меняться
+(или дальше расписание ещё не строилось).
+"""
+from structure_model.config import TOTAL_DAYS_IN_MONTH, PLANNER_MODE
+from structure_model.driver_scheduler import replan_routes, routes_for_day
+from structure_model.history_manager import load_history
+from structure_model.roster import roster_registry
+
+
+def _shift_key(rec):
+    # На отдых следующего дня влияют только время и код смены, не маршрут
+    if rec is None:
+        return None
+    return rec["time"], rec.get("shift_code")
+
+
+def _changed_drivers(before, after):
+    return {
+        drv for drv in before.keys() | after.keys()
+        if _shift_key(before.get(drv)) != _shift_key(after.get(drv))
+    }
+
+
+def recalculate_after_change(day, tab_nos, mode=PLANNER_MODE, last_day=TOTAL_DAYS_IN_MONTH, progress=None):
+    """
+    Пересчитывает маршруты водителей tab_nos начиная с дня day и дальше,
+    пока назначения меняются. Возвращает отчёт о пересчитанном.
+    progress передаётся в планировщик (см. driver_scheduler._plan_routes).
+    """
+    changed = {str(t).strip() for t in tab_nos}
+    recomputed = []
+    roster_registry.invalidate()
+
+    current = day
+    while current <= last_day and changed:
+        affected = {}
+        for drv in changed:
+            for transport, route in roster_registry.routes_of(drv):
+                affected.setdefault(transport, set()).add(route)
+
+        before = load_history(current)
+        if current > day and not before:
+            # Дальше расписание ещё не строилось — пересчитывать нечего
+            break
+
+        day_routes = []
+        for transport, routes in sorted(affected.items()):
+            scheduled = [r for r in routes_for_day(transport, current) if r in routes]
+            if scheduled:
+                replan_routes(current, transport, scheduled, mode, progress=progress)
+                day_routes += [{"transport": transport, "route": r} for r in scheduled]
+
+        changed = _changed_drivers(before, load_history(current))
+        recomputed.append({
+            "day": current,
+            "routes": day_routes,
+            "changed_drivers": len(changed),
+        })
+        current += 1
+
+    return {
+        "recomputed": recomputed,
+        "days": len(recomputed),
+        "routes": sum(len(d["routes"]) for d in recomputed),
+        "converged": not changed,
+    }
@@ -0,0 +1,141 @@
+"""
+Фоновые задачи планировщика для Flask-сервера.
+
+Пересчёты больше не выполняются в потоке запроса: эндпоинт ставит задачу
+в очередь и сразу отвечает 202 с её id, а интерфейс опрашивает /api/jobs/<id>.
+Одинаковые задачи, ещё стоящие в очереди, не дублируются.
+
+Планировщик пишет общие файлы истории, поэтому по умолчанию работает один
+поток (JOB_WORKERS в config).
+"""
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from structure_model.config import JOB_WORKERS, JOB_HISTORY_LIMIT
+from structure_model.metrics import histogram
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+JOB_DURATION = histogram(
+    "planner_job_duration_seconds",
+    "Длительность фоновых задач пересчёта.",
+    ("kind", "status"),
+)
+
+
+class JobProgress:
+    """Прогресс задачи по маршрутам; передаётся в планировщик как callback."""
+
+    def __init__(self, lock, total=None):
+        self._lock = lock
+        self.total = total   # None — заранее неизвестно (пересчёт по цепочке дней)
+        self.done = 0
+        self.routes = []
+
+    def __call__(self, transport, route):
+        with self._lock:
+            self.done += 1
+            self.routes.append(f"{transport}/{route}")
+
+    def as_dict(self):
+        return {"total": self.total, "done": self.done, "routes": list(self.routes)}
+
+
+class JobQueue:
+    def __init__(self, workers=JOB_WORKERS, history_limit=JOB_HISTORY_LIMIT):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="planner-job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._pending = {}   # ключ дедупликации -> id задачи в очереди
+        self._history_limit = history_limit
+
+    def submit(self, kind, key, func, *args, params=None, total=None, **kwargs):
+        """
+        Ставит func(*args, progress=..., **kwargs) в очередь.
+        key — ключ дедупликации, params — описание для /api/jobs,
+        total — ожидаемое число маршрутов, если известно.
+        Возвращает (задача, создана_ли_новая).
+        """
+        with self._lock:
+            if key in self._pending:
+                return self._snapshot(self._jobs[self._pending[key]]), False
+
+            job_id = uuid.uuid4().hex[:12]
+            job = {
+                "id": job_id,
+                "kind": kind,
+                "params": params,
+                "status": QUEUED,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "duration": None,
+                "progress": JobProgress(self._lock, total),
+                "result": None,
+                "error": None,
+            }
+            self._jobs[job_id] = job
+            self._pending[key] = job_id
+            self._trim()
+
+        self._executor.submit(self._run, job_id, key, func, args, kwargs)
+        return self.get(job_id), True
+
+    def _run(self, job_id, key, func, args, kwargs):
+        with self._lock:
+            job = self._jobs[job_id]
+            # Задача пошла в работу: следующий такой же запрос — уже новая задача
+            self._pending.pop(key, None)
+            job["status"] = RUNNING
+            job["started_at"] = time.time()
+
+        try:
+            result = func(*args, progress=job["progress"], **kwargs)
+            status, error = DONE, None
+        except Exception as e:
+            traceback.print_exc()
+            result, status, error = None, FAILED, f"{type(e).__name__}: {e}"
+
+        with self._lock:
+            job["status"] = status
+            job["result"] = result
+            job["error"] = error
+            job["finished_at"] = time.time()
+            job["duration"] = round(job["finished_at"] - job["started_at"], 3)
+        JOB_DURATION.observe(job["finished_at"] - job["started_at"], job["kind"], status)
+
+    def _trim(self):
+        finished = [j for j in self._jobs.values() if j["status"] in (DONE, FAILED)]
+        excess = len(self._jobs) - self._history_limit
+        for job in sorted(finished, key=lambda j: j["created_at"])[:max(excess, 0)]:
+            del self._jobs[job["id"]]
+
+    @staticmethod
+    def _snapshot(job):
+        out = {k: v for k, v in job.items() if k != "progress"}
+        out["progress"] = job["progress"].as_dict()
+        return out
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def list(self):
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda j: j["created_at"], reverse=True)
+            return [self._snapshot(j) for j in jobs]
+
+    def depth(self):
+        """Число задач в очереди и в работе."""
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if j["status"] in (QUEUED, RUNNING))
+
+
+job_queue = JobQueue()
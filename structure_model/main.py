@@ -1,26 +1,43 @@
-from structure_model.config import TOTAL_DAYS_IN_MONTH, FILE_PATH, HISTORY_JSON_DIR
-from structure_model.driver_scheduler import run_planner
+import argparse
+import sys
+
+from structure_model.config import TOTAL_DAYS_IN_MONTH, FILE_PATH, PLANNER_MODE, PLANNER_WORKERS
+from structure_model.driver_scheduler import plan_days
+from structure_model.history_manager import clear_history
+from structure_model.profiling import cprofile, profiler
 from structure_model.report_generator import generate_work_summary
-import os
 from structure_model.summary_report import write_summary_statistics
 from structure_model.absence_input import input_absent_drivers
 
-def auto_run_simulation(total_days, file_path):
+def auto_run_simulation(total_days, file_path, mode=PLANNER_MODE, workers=PLANNER_WORKERS, profile=None):
     print("--- Удаление старых логов ---")
-    for d in range(1, total_days + 2):
-        f = os.path.join(HISTORY_JSON_DIR, f"history_{d}.json")
-        if os.path.exists(f):
-            os.remove(f)
+    clear_history(range(1, total_days + 2))
 
-    for day in range(1, total_days + 1):
-        print(f"ЗАПУСК ДНЯ {day:02d}")
-        run_planner(day, day - 1)
+    print(f"ЗАПУСК ДНЕЙ 01-{total_days:02d} (процессов: {workers})")
+    profiler.reset()
+    with cprofile(profile):
+        sheets_ok = plan_days(range(1, total_days + 1), mode=mode, workers=workers)
 
     print("\n##################### СИМУЛЯЦИЯ ЗАВЕРШЕНА #####################")
     generate_work_summary(total_days, file_path)
 
+    print("\n=== ВРЕМЯ ПО ЭТАПАМ ===")
+    print(profiler.summary_table())
+    return sheets_ok
+
 
 if __name__ == "__main__":
-    auto_run_simulation(TOTAL_DAYS_IN_MONTH, FILE_PATH)
+    parser = argparse.ArgumentParser(description="Симуляция месяца и отчёты")
+    parser.add_argument("--mode", choices=("greedy", "optimal"), default=PLANNER_MODE)
+    parser.add_argument("--workers", type=int, default=PLANNER_WORKERS,
+                        help="число процессов для маршрутов одного дня")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="сохранить профиль cProfile (pstats) в FILE")
+    args = parser.parse_args()
+
+    sheets_ok = auto_run_simulation(TOTAL_DAYS_IN_MONTH, FILE_PATH, mode=args.mode, workers=args.workers,
+                                    profile=args.profile)
     write_summary_statistics()
-    input_absent_drivers()
\ No newline at end of file
+    input_absent_drivers()
+    if not sheets_ok:
+        sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""
+Метрики процесса в текстовом формате Prometheus (/metrics), без сторонних
+библиотек.
+
+Counter и Histogram копят значения по наборам меток; значения, которые
+дешевле снять в момент запроса (глубина очереди, размер файла отсутствий,
+замеры планировщика из profiling), отдают функции-сборщики
+(register_collector). render() собирает весь текст экспозиции.
+"""
+import threading
+
+# Границы корзин по умолчанию (секунды): от быстрых ответов кэша до пересчёта
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def sample_lines(name, help_text, kind, samples, label_names=()):
+    """Строки метрики по списку (значения меток, значение)."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for values, value in samples:
+        lines.append(f"{name}{_labels(label_names, values)} {_number(value)}")
+    return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        with self._lock:
+            samples = sorted(self._values.items())
+        return sample_lines(self.name, self.help, "counter", samples, self.label_names)
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}   # метки -> [счётчики корзин, сумма, число]
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, ([*s[0]], s[1], s[2])) for labels, s in self._series.items())
+        for labels, (counts, total, count) in series:
+            for bound, n in zip(self.buckets, counts):
+                le = _labels(self.label_names, labels, [("le", _number(float(bound)))])
+                lines.append(f"{self.name}_bucket{le} {n}")
+            le = _labels(self.label_names, labels, [("le", "+Inf")])
+            lines.append(f"{self.name}_bucket{le} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+# =============================================================================
+# РЕЕСТР
+# =============================================================================
+
+_metrics = []
+_collectors = []
+
+
+def counter(name, help_text, label_names=()):
+    metric = Counter(name, help_text, label_names)
+    _metrics.append(metric)
+    return metric
+
+
+def histogram(name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+    metric = Histogram(name, help_text, label_names, buckets)
+    _metrics.append(metric)
+    return metric
+
+
+def register_collector(func):
+    """func() -> список строк экспозиции; вызывается при каждом render()."""
+    _collectors.append(func)
+    return func
+
+
+def render():
+    lines = []
+    for metric in _metrics:
+        lines += metric.render()
+    for collect in _collectors:
+        try:
+            lines += collect()
+        except Exception as e:
+            print(f"[WARN] Сборщик метрик {collect.__name__}: {e}")
+    return "\n".join(lines) + "\n"
+
+
+# =============================================================================
+# ОБЩИЕ МЕТРИКИ
+# =============================================================================
+
+CACHE_REQUESTS = counter(
+    "planner_cache_requests_total",
+    "Обращения к кэшам (книга, табель, шаблоны, закрепления, ответы API).",
+    ("cache", "result"),
+)
+
+
+def cache_lookup(cache, hit):
+    """Отметить обращение к кэшу cache: hit=True — попадание, False — промах."""
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
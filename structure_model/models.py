@@ -4,6 +4,8 @@ from datetime import datetime
 
 class Absence(db.Model):
     __tablename__ = "absences"
+    # Планировщик ищет отсутствующих по дню и смене
+    __table_args__ = (db.Index("ix_absences_day_shift", "day", "shift"),)
     id = db.Column(db.Integer, primary_key=True)
     tab_no = db.Column(db.String(50), nullable=False, index=True)
     shift = db.Column(db.Integer, nullable=False)
@@ -15,7 +17,8 @@ class Absence(db.Model):
 class Route(db.Model):
     __tablename__ = "routes"
     id = db.Column(db.Integer, primary_key=True)
-    route_number = db.Column(db.Integer, nullable=False, unique=True, index=True)
+    # Строка: бывают номера с суффиксом ("93тб")
+    route_number = db.Column(db.String(20), nullable=False, unique=True, index=True)
     name = db.Column(db.String(255))
     sheet_name_workday = db.Column(db.String(255), nullable=False)
     sheet_name_weekend = db.Column(db.String(255), nullable=False)
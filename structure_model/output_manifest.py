@@ -0,0 +1,134 @@
+"""
+Манифест выходных файлов: какие (transport, route, day) уже спланированы.
+
+Планировщик отмечает маршруты дня после записи итогов (record), и
+/calendar-data отвечает по манифесту, не обходя каталоги output. Файл
+манифеста лежит в CACHE_DIR и перезаписывается атомарно; если его нет
+(первый запуск, очищенный кэш), он один раз собирается обходом каталогов.
+Перед чтением сверяется только mtime/размер файла: манифест перечитывается,
+лишь если его переписал другой процесс (например, планировщик из CLI).
+
+Формат: {"version": 1, "entries": [[transport, route, day, updated], ...]},
+updated — время записи (ISO, секунды).
+"""
+from datetime import datetime
+import json
+import os
+import threading
+
+from structure_model.config import CACHE_DIR, TRANSPORTS
+from structure_model.day_plan import planned_day
+from structure_model.utils import atomic_write, file_stamp
+
+MANIFEST_VERSION = 1
+MANIFEST_FILE = CACHE_DIR / "output_manifest.json"
+
+# Отметка «не загружен»: не совпадает ни с одним состоянием файла
+_STALE = object()
+
+
+class OutputManifest:
+    def __init__(self, path=MANIFEST_FILE, transports=TRANSPORTS):
+        self.path = path
+        self.transports = transports
+        self._lock = threading.Lock()
+        self._stamp = _STALE
+        self._entries = {}   # (transport, route, day) -> updated
+        self._days = []
+
+    def _scan(self):
+        """Записи по содержимому каталогов output (для отсутствующего манифеста)."""
+        entries = {}
+        for transport, cfg in self.transports.items():
+            output_root = cfg["output_dir"]
+            if not output_root.exists():
+                continue
+            for route in os.listdir(output_root):
+                route_path = output_root / route
+                if not route_path.is_dir():
+                    continue
+                for fname in os.listdir(route_path):
+                    day = planned_day(fname)
+                    if day is None:
+                        continue
+                    mtime = (route_path / fname).stat().st_mtime
+                    updated = datetime.fromtimestamp(mtime).isoformat(timespec="seconds")
+                    key = (transport, route, day)
+                    entries[key] = max(entries.get(key, updated), updated)
+        return entries
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != MANIFEST_VERSION:
+                return None
+            return {(t, r, int(d)): updated for t, r, d, updated in data["entries"]}
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write(self, entries):
+        data = {
+            "version": MANIFEST_VERSION,
+            "entries": [[t, r, d, updated] for (t, r, d), updated in sorted(entries.items())],
+        }
+        with atomic_write(self.path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+    def _set(self, entries, stamp):
+        self._entries = entries
+        self._days = sorted({day for _, _, day in entries})
+        self._stamp = stamp
+
+    def _refresh(self):
+        stamp = file_stamp(self.path)
+        if stamp == self._stamp:
+            return
+        with self._lock:
+            stamp = file_stamp(self.path)
+            if stamp == self._stamp:
+                return
+            entries = self._read() if stamp is not None else None
+            if entries is None:
+                print("[INFO] Манифест выходных файлов собирается по каталогам output")
+                entries = self._scan()
+                self._write(entries)
+                stamp = file_stamp(self.path)
+            self._set(entries, stamp)
+
+    def record(self, transport, day, routes):
+        """Отмечает записанные итоги маршрутов routes транспорта за день day."""
+        routes = list(routes)
+        if not routes:
+            return
+        self._refresh()
+        updated = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            # Берём файл с диска: его мог обновить другой процесс
+            entries = self._read() or dict(self._entries)
+            for route in routes:
+                entries[(transport, str(route), int(day))] = updated
+            self._write(entries)
+            self._set(entries, file_stamp(self.path))
+
+    def days(self):
+        """Отсортированные дни, для которых есть итог хотя бы одного маршрута."""
+        self._refresh()
+        return self._days
+
+    def entries(self):
+        """Копия записей: (transport, route, day) -> время записи."""
+        self._refresh()
+        return dict(self._entries)
+
+    def invalidate(self):
+        """Пересобрать манифест обходом каталогов при следующем обращении."""
+        with self._lock:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self._stamp = _STALE
+
+
+output_manifest = OutputManifest()
@@ -0,0 +1,257 @@
+"""
+Запись Excel-файлов: итоговые расписания Расписание_Итог_{day}.xlsx и
+табличные отчёты.
+
+Лист маршрута один раз извлекается из data.xlsx в отдельный шаблон
+(одна книга с единственным листом «Расписание») и кладётся в CACHE_DIR
+рядом с кэшем книги. Итог дня пишется потоково, без openpyxl: части
+шаблона копируются в новый zip как есть, а XML листа выводится по строкам,
+и в строках слотов заменяются только ячейки COL_SHIFT_*_INSERT.
+
+Отчёты (write_table) пишутся через write-only режим openpyxl из генератора
+строк, так что память не растёт с числом водителей.
+"""
+import re
+import threading
+import zipfile
+from io import BytesIO
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+from openpyxl.utils import column_index_from_string, get_column_letter
+
+from structure_model.config import FILE_PATH, CACHE_DIR
+from structure_model.metrics import cache_lookup
+from structure_model.sheet_catalog import sheet_names
+from structure_model.utils import atomic_write
+from structure_model.workbook_cache import get_compiled_workbook
+
+OUTPUT_SHEET_TITLE = "Расписание"
+
+# (sha256 книги, имя листа) -> байты шаблона / разобранный шаблон
+_templates = {}
+_sheet_templates = {}
+_templates_lock = threading.Lock()
+
+_ROW_RE = re.compile(rb'<row r="(\d+)"[^>]*?(?:/>|>.*?</row>)', re.S)
+_CELL_RE = re.compile(rb'<c r="([A-Z]+)\d+"([^>]*?)(?:/>|>.*?</c>)', re.S)
+_STYLE_RE = re.compile(rb' s="(\d+)"')
+_DIMENSION_RE = re.compile(rb'<dimension ref="([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?"')
+
+
+def _template_file(digest, sheet_name):
+    return CACHE_DIR / "templates" / digest[:16] / f"{sheet_name}.xlsx"
+
+
+def _extract_template(file_path, sheet_name):
+    """Тот же приём, что раньше делался на каждый день: удалить все листы, кроме нужного."""
+    # Проверка по каталогу — до загрузки всей книги
+    if sheet_name not in sheet_names(file_path):
+        raise KeyError(f"Лист '{sheet_name}' не найден в {file_path}")
+    wb = load_workbook(file_path)
+    for sh in wb.sheetnames[:]:
+        if sh != sheet_name:
+            del wb[sh]
+    wb[sheet_name].title = OUTPUT_SHEET_TITLE
+
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def get_route_template(sheet_name, file_path=FILE_PATH):
+    """Байты шаблона листа маршрута (создаётся один раз на версию data.xlsx)."""
+    digest = get_compiled_workbook(file_path)["sha256"]
+    key = (digest, sheet_name)
+
+    with _templates_lock:
+        if key in _templates:
+            return _templates[key]
+
+        path = _template_file(digest, sheet_name)
+        if path.exists():
+            data = path.read_bytes()
+        else:
+            print(f"[Шаблон] Извлечение листа {sheet_name}")
+            data = _extract_template(file_path, sheet_name)
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # Шаблон могут создавать несколько процессов (--workers)
+                with atomic_write(path) as f:
+                    f.write(data)
+            except OSError as e:
+                print(f"[WARN] Не удалось сохранить шаблон {path}: {e}")
+
+        _templates[key] = data
+        return data
+
+
+class _SheetTemplate:
+    """Шаблон, разобранный для потоковой записи: части zip и строки листа."""
+
+    def __init__(self, data):
+        with zipfile.ZipFile(BytesIO(data)) as zin:
+            self.parts = [(info, zin.read(info)) for info in zin.infolist()]
+
+        self.sheet_part = next(
+            info.filename for info, _ in self.parts
+            if info.filename.startswith("xl/worksheets/sheet")
+        )
+        xml = dict((info.filename, body) for info, body in self.parts)[self.sheet_part]
+        xml = xml.replace(b"<sheetData />", b"<sheetData></sheetData>")
+        xml = xml.replace(b"<sheetData/>", b"<sheetData></sheetData>")
+
+        start = xml.index(b"<sheetData>") + len(b"<sheetData>")
+        end = xml.index(b"</sheetData>")
+        self.head, self.tail = xml[:start], xml[end:]
+        self.rows = [(int(m.group(1)), m.group(0)) for m in _ROW_RE.finditer(xml, start, end)]
+
+    def _head(self, stamps):
+        """Начало XML листа; dimension расширяется, если штампы выходят за него."""
+        m = _DIMENSION_RE.search(self.head)
+        if not m or not stamps:
+            return self.head
+        first_col, first_row = m.group(1), m.group(2)
+        last_col = column_index_from_string((m.group(3) or m.group(1)).decode())
+        last_row = int(m.group(4) or m.group(2))
+        last_row = max(last_row, max(row for row, _, _ in stamps))
+        last_col = max(last_col, max(col for _, col, _ in stamps))
+        ref = first_col + first_row + b":" + get_column_letter(last_col).encode() + str(last_row).encode()
+        return self.head[:m.start()] + b'<dimension ref="' + ref + b'"' + self.head[m.end():]
+
+    def iter_sheet_xml(self, stamps):
+        """XML листа по частям; stamps — (row, column, value)."""
+        by_row = {}
+        for row, col, value in stamps:
+            by_row.setdefault(row, {})[col] = value
+
+        yield self._head(stamps)
+        for row_num, row_xml in self.rows:
+            for extra in sorted(r for r in by_row if r < row_num):
+                yield _row_xml(extra, by_row.pop(extra))
+            values = by_row.pop(row_num, None)
+            yield _patch_row(row_xml, row_num, values) if values else row_xml
+        for extra in sorted(by_row):
+            yield _row_xml(extra, by_row[extra])
+        yield self.tail
+
+
+def _cell_xml(ref, value, style=None):
+    attrs = f' r="{ref}"'.encode()
+    if style:
+        attrs += b' s="' + style + b'"'
+    if value is None:
+        return b"<c" + attrs + b" />"
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return b"<c" + attrs + b' t="n"><v>' + repr(value).encode() + b"</v></c>"
+    return (
+        b"<c" + attrs + b' t="inlineStr"><is><t>'
+        + escape(str(value)).encode("utf-8") + b"</t></is></c>"
+    )
+
+
+def _row_xml(row_num, values):
+    cells = b"".join(
+        _cell_xml(f"{get_column_letter(col)}{row_num}", value)
+        for col, value in sorted(values.items())
+    )
+    return f'<row r="{row_num}">'.encode() + cells + b"</row>"
+
+
+def _patch_row(row_xml, row_num, values):
+    """Заменяет/добавляет ячейки строки, сохраняя стиль заменяемых ячеек."""
+    if row_xml.endswith(b"/>") and b"</row>" not in row_xml:
+        open_tag, body = row_xml[:-2].rstrip() + b">", b""
+    else:
+        split = row_xml.index(b">") + 1
+        open_tag, body = row_xml[:split], row_xml[split:-len(b"</row>")]
+
+    cells = [
+        (column_index_from_string(m.group(1).decode()), m.group(2), m.group(0))
+        for m in _CELL_RE.finditer(body)
+    ]
+    existing = {col for col, _, _ in cells}
+    for col, value in values.items():
+        if col not in existing:
+            cells.append((col, b"", None))
+    cells.sort(key=lambda c: c[0])
+
+    out = [open_tag]
+    for col, attrs, cell_xml in cells:
+        if col in values:
+            style = _STYLE_RE.search(attrs)
+            ref = f"{get_column_letter(col)}{row_num}"
+            out.append(_cell_xml(ref, values[col], style.group(1) if style else None))
+        else:
+            out.append(cell_xml)
+    out.append(b"</row>")
+    return b"".join(out)
+
+
+def _sheet_template(sheet_name, file_path=FILE_PATH):
+    digest = get_compiled_workbook(file_path)["sha256"]
+    key = (digest, sheet_name)
+    template = _sheet_templates.get(key)
+    cache_lookup("route_template", template is not None)
+    if template is None:
+        template = _SheetTemplate(get_route_template(sheet_name, file_path))
+        with _templates_lock:
+            _sheet_templates[key] = template
+    return template
+
+
+def write_route_schedule(out_file, sheet_name, stamps, file_path=FILE_PATH):
+    """
+    Сохраняет итог по маршруту.
+
+    stamps — список (excel_row, column, value): какие ячейки шаблона заменить.
+    Остальные ячейки остаются как в data.xlsx.
+    """
+    template = _sheet_template(sheet_name, file_path)
+    with zipfile.ZipFile(Path(out_file), "w", zipfile.ZIP_DEFLATED) as zout:
+        for info, body in template.parts:
+            if info.filename != template.sheet_part:
+                zout.writestr(info, body)
+                continue
+            sheet_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+            sheet_info.compress_type = zipfile.ZIP_DEFLATED
+            with zout.open(sheet_info, "w") as f:
+                for chunk in template.iter_sheet_xml(stamps):
+                    f.write(chunk)
+
+
+# =============================================================================
+# ТАБЛИЧНЫЕ ОТЧЁТЫ
+# =============================================================================
+
+_THIN = Side(style="thin")
+_HEADER_FONT = Font(bold=True)
+_HEADER_BORDER = Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN)
+_HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="top")
+
+
+def _header_cell(ws, value):
+    # Оформление заголовков и индекса — как у DataFrame.to_excel
+    cell = WriteOnlyCell(ws, value=value)
+    cell.font = _HEADER_FONT
+    cell.border = _HEADER_BORDER
+    cell.alignment = _HEADER_ALIGNMENT
+    return cell
+
+
+def write_table(out_file, header, rows, sheet_title="Sheet1"):
+    """
+    Потоковая запись таблицы с индексом в первом столбце.
+
+    header — заголовки (первый — имя индекса), rows — итератор строк
+    (индекс, значение, ...); строки записываются по мере получения.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_title)
+    ws.append([_header_cell(ws, h) for h in header])
+    for index, *values in rows:
+        ws.append([_header_cell(ws, index), *values])
+    wb.save(Path(out_file))
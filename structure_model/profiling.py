@@ -0,0 +1,176 @@
+"""
+Замеры этапов планировщика.
+
+span(stage, day, transport, route) — контекстный менеджер, который
+добавляет время этапа к записи (day, transport, route); count(...)
+добавляет счётчики (слоты, просмотренные кандидаты, НЕТ_РЕЗЕРВА). Этапы
+уровня дня (история, отсутствия) пишутся с route=None. Накладные расходы —
+один perf_counter на этап, поэтому замеры включены всегда.
+
+Воркеры параллельного прогона копят замеры в своём процессе и возвращают
+snapshot(), главный процесс сливает их через merge().
+
+cprofile(path) — необязательный полный профиль cProfile в файл pstats
+(main.py / driver_scheduler.py --profile).
+"""
+from contextlib import contextmanager
+import cProfile
+import pstats
+import threading
+import time
+
+# Этапы в порядке конвейера (порядок строк итоговой таблицы)
+STAGES = (
+    "load_history",
+    "load_absences",
+    "get_slots",
+    "load_roster",
+    "assignment",
+    "write",
+    "save_history",
+)
+
+# Счётчики маршрута
+COUNTERS = ("slots", "candidates", "no_reserve")
+
+
+class Profiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.records = {}   # (day, transport, route) -> {этап/счётчик: значение}
+        self.calls = {}     # этап -> число вызовов
+
+    def _add(self, key, name, value):
+        with self._lock:
+            record = self.records.setdefault(key, {})
+            record[name] = record.get(name, 0) + value
+
+    @contextmanager
+    def span(self, stage, day=None, transport=None, route=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add((day, transport, route), stage, time.perf_counter() - start)
+            with self._lock:
+                self.calls[stage] = self.calls.get(stage, 0) + 1
+
+    def count(self, day, transport, route, **counters):
+        for name, value in counters.items():
+            self._add((day, transport, route), name, value)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "records": {key: dict(rec) for key, rec in self.records.items()},
+                "calls": dict(self.calls),
+            }
+
+    def merge(self, snapshot):
+        for key, record in snapshot["records"].items():
+            for name, value in record.items():
+                self._add(key, name, value)
+        with self._lock:
+            for stage, calls in snapshot["calls"].items():
+                self.calls[stage] = self.calls.get(stage, 0) + calls
+
+    def reset(self):
+        with self._lock:
+            self.records = {}
+            self.calls = {}
+
+    # -------------------------------------------------------------------------
+    # Итоги
+    # -------------------------------------------------------------------------
+
+    def totals(self, by=None):
+        """
+        Сумма значений по всем записям или по группам: by(key) -> группа
+        (None — запись пропускается).
+        """
+        groups = {}
+        with self._lock:
+            records = list(self.records.items())
+        for key, record in records:
+            group = by(key) if by else "all"
+            if group is None:
+                continue
+            acc = groups.setdefault(group, {})
+            for name, value in record.items():
+                acc[name] = acc.get(name, 0) + value
+        return groups if by else groups.get("all", {})
+
+    def summary_table(self, top=5):
+        """Текстовая таблица: этапы, счётчики, самые долгие дни и маршруты."""
+        totals = self.totals()
+        stage_time = sum(totals.get(s, 0) for s in STAGES)
+        lines = [
+            f"{'Этап':<15}{'вызовов':>9}{'всего, с':>11}{'сред., мс':>11}{'доля':>8}",
+            "-" * 54,
+        ]
+        for stage in STAGES:
+            seconds, calls = totals.get(stage, 0), self.calls.get(stage, 0)
+            if not calls:
+                continue
+            share = seconds / stage_time if stage_time else 0
+            lines.append(
+                f"{stage:<15}{calls:>9}{seconds:>11.2f}{seconds / calls * 1000:>11.1f}{share:>8.1%}"
+            )
+        lines.append("-" * 54)
+        lines.append(f"{'итого':<15}{'':>9}{stage_time:>11.2f}")
+        lines.append("")
+        lines.append(
+            "Слотов: {slots}, просмотрено кандидатов: {candidates}, НЕТ_РЕЗЕРВА: {no_reserve}".format(
+                **{name: int(totals.get(name, 0)) for name in COUNTERS}
+            )
+        )
+
+        def slowest(groups, title, label):
+            ranked = sorted(
+                groups.items(),
+                key=lambda kv: -sum(kv[1].get(s, 0) for s in STAGES),
+            )[:top]
+            if not ranked:
+                return
+            lines.append("")
+            lines.append(title)
+            for group, acc in ranked:
+                seconds = sum(acc.get(s, 0) for s in STAGES)
+                stage, stage_seconds = max(((s, acc.get(s, 0)) for s in STAGES), key=lambda x: x[1])
+                lines.append(
+                    f"  {label(group):<20}{seconds:>8.2f} с  (больше всего: {stage} {stage_seconds:.2f} с, "
+                    f"НЕТ_РЕЗЕРВА: {int(acc.get('no_reserve', 0))})"
+                )
+
+        slowest(self.totals(by=lambda key: key[0]), "Самые долгие дни:", lambda d: f"день {d}")
+        slowest(
+            self.totals(by=lambda key: key[1:] if key[2] is not None else None),
+            "Самые долгие маршруты:",
+            lambda tr: f"{tr[0]} / {tr[1]}",
+        )
+        return "\n".join(lines)
+
+
+profiler = Profiler()
+
+
+@contextmanager
+def cprofile(path=None, limit=20):
+    """
+    Полный профиль cProfile блока в файл pstats path и топ-limit функций
+    по суммарному времени в консоль. path=None — без профилирования.
+    В параллельном прогоне профилируется только главный процесс.
+    """
+    if not path:
+        yield
+        return
+
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        prof.dump_stats(str(path))
+        print(f"\n[Профиль] Сохранён: {path}")
+        pstats.Stats(prof).sort_stats("cumulative").print_stats(limit)
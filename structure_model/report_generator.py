@@ -1,74 +1,97 @@
-import pandas as pd
-import json
-import os
-from structure_model.config import HISTORY_JSON_DIR, OUTPUT_DIR, TAB_SHEET_NAME
-from structure_model.shift_parser import calculate_rest_duration
+"""
+Сводный отчёт нагрузки Отчет_Нагрузки_Дни_1_по_N.xlsx.
 
+История за месяц загружается одной матрицей водитель x день (HistoryStore),
+отдых между сменами считается разностью массивов минут, а текст ячеек
+формируется один раз на каждое уникальное сочетание длительности и отдыха.
+Текст совпадает с прежним построчным вариантом отчёта.
+Матрица строится порциями по REPORT_CHUNK_SIZE водителей прямо во время
+записи: в памяти только история месяца и текущая порция строк. Файл пишется
+потоково (output_writer.write_table) в том же виде, что давал
+DataFrame.to_excel.
+"""
+import numpy as np
+from structure_model.config import OUTPUT_DIR, REPORT_CHUNK_SIZE, TAB_SHEET_NAME
+from structure_model.history_manager import HistoryStore
+from structure_model.output_writer import write_table
+from structure_model.shift_parser import MINUTES_IN_DAY, rest_minutes
+from structure_model.timesheet import get_timesheet
 
-def _normalize_driver_ids(df, driver_id_col):
-    """Привести табельные к строкам без .0, как в new_model.generate_work_summary."""
-    all_ids = []
-    for x in df[driver_id_col].dropna():
-        try:
-            all_ids.append(str(int(float(x))))
-        except (ValueError, TypeError):
-            # если не число — просто приводим к строке
-            all_ids.append(str(x).strip())
-    return all_ids
+# Коды отдыха, не являющиеся минутами
+REST_FULL = -1   # на следующий день смены нет
+REST_NA = -2     # последний день отчёта
+
+DAY_OFF_TEXT = "--- Выходной"
+
+
+def _rest_text(code):
+    if code == REST_FULL:
+        return "Отдых: Полный"
+    if code == REST_NA:
+        return "Отдых: Н/Д"
+    # round() по float часов — те же значения, что и раньше
+    return f"Отдых: {round(code / 60, 1)} ч."
+
+
+def build_work_matrix(all_drivers, target_day, store=None):
+    """Текст ячеек отчёта: массив строк водитель x день (1..target_day)."""
+    store = store or HistoryStore(1, target_day + 1)
+    cols = store.columns
+
+    # Строки истории для водителей отчёта (дни 1..target_day+1), -1 — не работал
+    idx = np.array([store.driver_index.get(d, -1) for d in all_drivers], dtype=np.int64)
+    rows = np.full((len(all_drivers), target_day + 1), -1, dtype=np.int64)
+    known = idx >= 0
+    rows[known] = store.row_at[idx[known], :target_day + 1]
+
+    cur, nxt = rows[:, :target_day], rows[:, 1:]
+    worked, has_next = cur >= 0, nxt >= 0
+    cur_rows, nxt_rows = cur[worked], nxt[worked]
+
+    end_min = cols["end_min"][cur_rows] + np.where(cols["is_next_day"][cur_rows], MINUTES_IN_DAY, 0)
+    rest = rest_minutes(end_min, cols["start_min"][np.maximum(nxt_rows, 0)].astype(np.int64))
+    last_day = np.broadcast_to(np.arange(1, target_day + 1) == target_day, cur.shape)[worked]
+    rest = np.where(has_next[worked], rest, np.where(last_day, REST_NA, REST_FULL))
+
+    # Текст строится по уникальным парам (длительность, отдых)
+    durations = cols["duration"][cur_rows]
+    dur_values, dur_inv = np.unique(durations, return_inverse=True)
+    rest_values, rest_inv = np.unique(rest, return_inverse=True)
+    pairs, pair_inv = np.unique(dur_inv * len(rest_values) + rest_inv, return_inverse=True)
+
+    labels = np.array([
+        f"Работа: {dur_values[p // len(rest_values)].item()} ч. | "
+        f"{_rest_text(rest_values[p % len(rest_values)].item())}"
+        for p in pairs.tolist()
+    ], dtype=object)
+
+    out = np.full(cur.shape, DAY_OFF_TEXT, dtype=object)
+    out[worked] = labels[pair_inv.ravel()] if len(labels) else []
+    return out
 
 
 def generate_work_summary(target_day, file_path):
     print("\n\n=== ГЕНЕРАЦИЯ СВОДНОГО ОТЧЕТА ===")
     try:
-        # Берём тот же лист "Весь_табель", где описаны все типы графиков
-        df_tab = pd.read_excel(file_path, sheet_name=TAB_SHEET_NAME)
-        driver_id_col = df_tab.columns[0]
-        graphik_col = df_tab.columns[1]
-
-        # Карта: таб. номер -> тип графика (4*2, 3*3 и т.п.)
-        df_temp = df_tab.set_index(df_tab[driver_id_col].astype(str))
-        driver_graphik = df_temp[graphik_col].to_dict()
-
-        # Список всех табельных номеров в нормализованном виде
-        all_drivers = _normalize_driver_ids(df_tab, driver_id_col)
+        # Лист "Весь_табель": табельные и типы графиков (общий Timesheet)
+        timesheet = get_timesheet(file_path)
+        driver_graphik = timesheet.graph_by_tab_no()
+        all_drivers = [t for t in timesheet.tab_no if t is not None]
     except Exception as e:
         print(f"Ошибка чтения листа '{TAB_SHEET_NAME}' для отчёта: {e}")
         return
 
-    history_data = {}
-    for day in range(1, target_day + 2):
-        filename = os.path.join(HISTORY_JSON_DIR, f"history_{day}.json")
-        if os.path.exists(filename):
-            with open(filename, 'r', encoding='utf-8') as f:
-                history_data[day] = json.load(f)
-        else:
-            history_data[day] = {}
-
-    report_data = []
-    for driver_id in all_drivers:
-        row = {'График': driver_graphik.get(driver_id, 'N/A')}
-        for day in range(1, target_day + 1):
-            day_hist = history_data.get(day, {})
-            if driver_id in day_hist:
-                work = day_hist[driver_id]
-                duration = work['duration']
-                end_str = work['end_str']
-                is_next = work.get('is_next_day', False)
-                next_hist = history_data.get(day + 1, {})
-                if driver_id in next_hist:
-                    rest = calculate_rest_duration(end_str, is_next, next_hist[driver_id]['start_str'])
-                    rest_rep = f"Отдых: {rest} ч."
-                elif day == target_day:
-                    rest_rep = "Отдых: Н/Д"
-                else:
-                    rest_rep = "Отдых: Полный"
-                row[f'День {day}'] = f"Работа: {duration} ч. | {rest_rep}"
-            else:
-                row[f'День {day}'] = "--- Выходной"
-        report_data.append(row)
-
-    df_report = pd.DataFrame(report_data, index=pd.Index(all_drivers, name='Таб. №'))
+    store = HistoryStore(1, target_day + 1)
+
+    def rows():
+        for start in range(0, len(all_drivers), REPORT_CHUNK_SIZE):
+            chunk = all_drivers[start:start + REPORT_CHUNK_SIZE]
+            cells = build_work_matrix(chunk, target_day, store)
+            for driver_id, driver_cells in zip(chunk, cells):
+                yield (driver_id, driver_graphik.get(driver_id, 'N/A'), *driver_cells)
+
+    header = ['Таб. №', 'График'] + [f'День {day}' for day in range(1, target_day + 1)]
     report_file = f"{OUTPUT_DIR}/Отчет_Нагрузки_Дни_1_по_{target_day}.xlsx"
-    df_report.to_excel(report_file)
+    write_table(report_file, header, rows())
     print(f"\n[Отчет] Создан: **{report_file}**")
-    return report_file
\ No newline at end of file
+    return report_file
@@ -0,0 +1,62 @@
+"""
+Кэш готовых ответов API, построенных по файлам output.
+
+Ключ записи — (transport, route, day) и отметки (mtime_ns, размер) файлов,
+из которых собран ответ: если файл переписан, отметка другая и запись
+считается устаревшей. ETag получается из тех же отметок, поэтому ответ 304
+отдаётся без чтения Excel даже после вытеснения записи. Планировщик
+сбрасывает записи маршрута явно после записи Расписание_Итог (invalidate).
+Вытеснение — LRU, не больше SCHEDULE_CACHE_SIZE записей.
+"""
+from collections import OrderedDict
+import hashlib
+import threading
+
+from structure_model.config import SCHEDULE_CACHE_SIZE
+from structure_model.metrics import cache_lookup
+
+
+def make_etag(key, stamps):
+    raw = repr((key, stamps)).encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, name, maxsize=SCHEDULE_CACHE_SIZE):
+        self.name = name   # метка cache в planner_cache_requests_total
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (stamps, payload)
+
+    def get(self, key, stamps):
+        """Сохранённый ответ, если файлы с тех пор не менялись, иначе None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != stamps:
+                cache_lookup(self.name, False)
+                return None
+            self._entries.move_to_end(key)
+        cache_lookup(self.name, True)
+        return entry[1]
+
+    def put(self, key, stamps, payload):
+        with self._lock:
+            self._entries[key] = (stamps, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, transport=None, route=None, day=None):
+        """Удаляет записи, совпадающие по заданным полям ключа (None — любое)."""
+        with self._lock:
+            for key in list(self._entries):
+                t, r, d = key
+                if (transport in (None, t)) and (route in (None, r)) and (day in (None, d)):
+                    del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Ответы /api/schedule/<day>/<route>: ключ (transport, route, day)
+schedule_cache = ResponseCache("schedule")
@@ -0,0 +1,143 @@
+"""
+Закрепления водителей за маршрутами (consolidation/<transport>/<route>/data.json).
+
+Все файлы читаются один раз и раскладываются по общему DriverIndex:
+    маршрут -> позиции водителей в индексе (и маска для пула кандидатов),
+    водитель -> {(transport, route), ...} (обратный индекс).
+mtime/размер файлов сверяются не чаще раза в ROSTER_CHECK_INTERVAL секунд
+и сразу после invalidate() (его вызывают планировщик и инкрементальный
+пересчёт в начале прогона); перечитывается лишь изменившийся файл. Один
+экземпляр на процесс делят планировщик, инкрементальный пересчёт и сервер.
+"""
+import json
+import threading
+import time
+
+import numpy as np
+
+from structure_model.config import BASE_DIR, ROSTER_CHECK_INTERVAL, TRANSPORTS
+from structure_model.driver_index import get_driver_index
+from structure_model.metrics import cache_lookup
+from structure_model.utils import file_stamp
+
+CONSOLIDATION_DIR = BASE_DIR / "consolidation"
+
+
+def roster_path(transport, route):
+    return CONSOLIDATION_DIR / transport / route / "data.json"
+
+
+def _read_roster(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    return frozenset(
+        str(e["tab_number"]).strip()
+        for e in data.get("employees", [])
+        if e.get("tab_number") is not None
+    )
+
+
+class RosterRegistry:
+    def __init__(self, transports=TRANSPORTS, check_interval=ROSTER_CHECK_INTERVAL):
+        self.transports = transports
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked_at = None   # time.monotonic() последней сверки файлов
+        self._stamps = {}      # (transport, route) -> (mtime_ns, size) | None
+        self._drivers = {}     # (transport, route) -> frozenset(tab_no)
+        self._indices = {}     # (transport, route) -> позиции в DriverIndex
+        self._masks = {}       # (transport, route) -> маска длины индекса на момент построения
+        self._routes_of = {}   # tab_no -> frozenset((transport, route))
+
+    def keys(self):
+        """Все (transport, route) из конфигурации (будни и выходные)."""
+        for transport, cfg in self.transports.items():
+            routes = set(cfg["routes"]["workday"]) | set(cfg["routes"]["weekend"])
+            for route in sorted(routes):
+                yield transport, route
+
+    def _load(self, key, stamp):
+        path = roster_path(*key)
+        drivers = frozenset()
+        if stamp is None:
+            print(f"[ERROR] Нет consolidation: {path}")
+        else:
+            try:
+                drivers = _read_roster(path)
+            except Exception as e:
+                print(f"[ERROR] Не удалось прочитать consolidation {path}: {e}")
+
+        index = get_driver_index().add(sorted(drivers))
+        self._drivers[key] = drivers
+        self._indices[key] = np.array(sorted(index.index[t] for t in drivers), dtype=np.int64)
+        self._masks.pop(key, None)
+        self._stamps[key] = stamp
+
+    def _refresh(self):
+        now = time.monotonic()
+        checked_at = self._checked_at
+        if checked_at is not None and now - checked_at < self.check_interval:
+            cache_lookup("roster", True)
+            return
+
+        stamps = {key: file_stamp(roster_path(*key)) for key in self.keys()}
+        if all(key in self._stamps and self._stamps[key] == stamp for key, stamp in stamps.items()):
+            self._checked_at = now
+            cache_lookup("roster", True)
+            return
+
+        with self._lock:
+            changed = [
+                key for key, stamp in stamps.items()
+                if key not in self._stamps or self._stamps[key] != stamp
+            ]
+            self._checked_at = now
+            if not changed:
+                return
+            cache_lookup("roster", False)
+            for key in changed:
+                self._load(key, stamps[key])
+
+            routes_of = {}
+            for key in self.keys():
+                for drv in self._drivers.get(key, ()):
+                    routes_of.setdefault(drv, set()).add(key)
+            self._routes_of = {drv: frozenset(keys) for drv, keys in routes_of.items()}
+
+    def drivers(self, transport, route):
+        """Табельные, закреплённые за маршрутом."""
+        self._refresh()
+        return self._drivers.get((transport, str(route)), frozenset())
+
+    def masks(self, transport, routes):
+        """
+        Маски водителей маршрутов по общему DriverIndex, все одной длины.
+        Маска собирается заново, только если маршрут перечитан или индекс
+        вырос; массивы общие, поэтому только для чтения.
+        """
+        self._refresh()
+        n = len(get_driver_index())
+        out = []
+        for route in routes:
+            key = (transport, str(route))
+            mask = self._masks.get(key)
+            if mask is None or len(mask) != n:
+                mask = np.zeros(n, dtype=bool)
+                mask[self._indices.get(key, np.empty(0, dtype=np.int64))] = True
+                mask.setflags(write=False)
+                self._masks[key] = mask
+            out.append(mask)
+        return out
+
+    def routes_of(self, tab_no):
+        """Маршруты водителя: frozenset((transport, route))."""
+        self._refresh()
+        return self._routes_of.get(str(tab_no).strip(), frozenset())
+
+    def invalidate(self):
+        """Следующее обращение сверит файлы, не дожидаясь ROSTER_CHECK_INTERVAL."""
+        self._checked_at = None
+
+
+roster_registry = RosterRegistry()
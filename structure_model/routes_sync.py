@@ -3,22 +3,29 @@ import os
 import re
 from datetime import datetime
 
-import pandas as pd
+from sqlalchemy import Integer, MetaData, Table, inspect, insert, select, update
 
 from structure_model import config
 from .extensions import db
 from structure_model.models import Route
-from flask import current_app
+from structure_model.sheet_catalog import sheet_names
 
-WORK_RE = re.compile(r'Расписание_рабочего_дня[_\s]?(\d+)$', flags=re.IGNORECASE)
-WEEK_RE = re.compile(r'Расписание_выходного_дня[_\s]?(\d+)$', flags=re.IGNORECASE)
+# Номер маршрута — цифры и необязательный буквенный суффикс ("9", "93тб")
+WORK_RE = re.compile(r'Расписание_рабочего_дня[_\s]?(\d+[^\W\d_]*)$', flags=re.IGNORECASE)
+WEEK_RE = re.compile(r'Расписание_выходного_дня[_\s]?(\d+[^\W\d_]*)$', flags=re.IGNORECASE)
+
+
+def route_sort_key(num):
+    """Порядок маршрутов: по числу, затем по суффиксу ("9" < "10" < "93" < "93тб")."""
+    m = re.match(r'(\d+)(.*)', str(num))
+    return (int(m.group(1)), m.group(2)) if m else (float('inf'), str(num))
 
 
 def build_mapping_from_sheet_names(sheet_names):
     """
     На вход: список имён листов (строк).
     Возвращает dict:
-    { route_number: {'sheet_name_workday':..., 'sheet_name_weekend':...} }
+    { route_number (str): {'sheet_name_workday':..., 'sheet_name_weekend':...} }
     """
     found = {}
     for name in sheet_names:
@@ -26,14 +33,14 @@ def build_mapping_from_sheet_names(sheet_names):
 
         m = WORK_RE.search(n)
         if m:
-            num = int(m.group(1))
+            num = m.group(1).lower()
             entry = found.setdefault(num, {})
             entry['sheet_name_workday'] = n
             continue
 
         m = WEEK_RE.search(n)
         if m:
-            num = int(m.group(1))
+            num = m.group(1).lower()
             entry = found.setdefault(num, {})
             entry['sheet_name_weekend'] = n
 
@@ -41,23 +48,58 @@ def build_mapping_from_sheet_names(sheet_names):
 
 
 def get_sheet_names_from_excel(file_path):
-    """Читает workbook и возвращает список имён листов (без загрузки данных)."""
+    """Имена листов книги по xl/workbook.xml (sheet_catalog), без загрузки данных."""
     try:
-        xl = pd.ExcelFile(file_path)
-        return xl.sheet_names
+        return sheet_names(file_path)
     except Exception:
         return []
 
 
+def upgrade_routes_table(engine=None):
+    """
+    В старых базах routes.route_number — INTEGER, и номер "93тб" в него не
+    ложится. Такая таблица пересоздаётся по текущей модели Route с теми же
+    строками (номер — строкой) в одной транзакции. True — таблица пересоздана.
+    """
+    engine = engine or db.engine
+    table = Route.__table__
+    inspector = inspect(engine)
+    if not inspector.has_table(table.name):
+        return False
+    columns = {c["name"]: c["type"] for c in inspector.get_columns(table.name)}
+    if not isinstance(columns.get("route_number"), Integer):
+        return False
+
+    with engine.begin() as conn:
+        old = Table(table.name, MetaData(), autoload_with=conn)
+        rows = conn.execute(select(old)).mappings().all()
+        old.drop(conn)
+        table.create(conn)
+        if rows:
+            conn.execute(insert(table), [
+                {**{c.name: row[c.name] for c in table.columns if c.name in row},
+                 "route_number": str(row["route_number"])}
+                for row in rows
+            ])
+    print(f"[INFO] Таблица {table.name} пересоздана: route_number — строка ({len(rows)} строк)")
+    return True
+
+
 def sync_routes(sheet_names=None, excel_file=None, output_dir=None, commit_missing_files=False):
     """
     Синхронизирует routes в БД и обновляет config.SCHEDULE_SHEETS.
 
+    Существующие маршруты читаются одним запросом, каталог output — одним
+    listdir, вставки и обновления уходят пакетами (executemany) в одной
+    транзакции.
+
     ВАЖНО:
     - НЕ вызывает ensure_db_created()
     - Предполагает, что app_context уже существует
+    - Старую таблицу с числовым route_number пересоздаёт (upgrade_routes_table)
     """
     output_dir = output_dir or config.OUTPUT_DIR
+    upgrade_routes_table()
 
     if sheet_names is None:
         excel_file = excel_file or config.FILE_PATH
@@ -72,8 +114,21 @@ def sync_routes(sheet_names=None, excel_file=None, output_dir=None, commit_missi
         'mapping_count': len(mapping),
     }
 
+    try:
+        output_files = set(os.listdir(output_dir))
+    except OSError:
+        output_files = set()
+
+    # Номер в старых базах мог храниться числом — ключи приводятся к строке
+    existing_routes = {str(r.route_number): r for r in Route.query.all()}
+
+    now = datetime.utcnow()
+    inserts = []
+    updates = []
+
     # app_context должен быть активен снаружи
-    for num, info in sorted(mapping.items()):
+    for num in sorted(mapping, key=route_sort_key):
+        info = mapping[num]
         sheet_w = info.get('sheet_name_workday') or f'Расписание_рабочего_дня_{num}'
         sheet_q = info.get('sheet_name_weekend') or f'Расписание_выходного_дня_{num}'
 
@@ -84,53 +139,59 @@ def sync_routes(sheet_names=None, excel_file=None, output_dir=None, commit_missi
         expected_workfile = f"Расписание_рабочего_дня_{num}.xlsx"
         expected_weekfile = f"Расписание_выходного_дня_{num}.xlsx"
 
-        work_exists = os.path.exists(os.path.join(output_dir, expected_workfile))
-        week_exists = os.path.exists(os.path.join(output_dir, expected_weekfile))
+        work_exists = expected_workfile in output_files
+        week_exists = expected_weekfile in output_files
 
-        existing = Route.query.filter_by(route_number=num).first()
+        existing = existing_routes.get(num)
 
         if existing:
-            changed = False
+            changes = {}
 
             if existing.sheet_name_workday != sheet_w:
-                existing.sheet_name_workday = sheet_w
-                changed = True
+                changes['sheet_name_workday'] = sheet_w
 
             if existing.sheet_name_weekend != sheet_q:
-                existing.sheet_name_weekend = sheet_q
-                changed = True
+                changes['sheet_name_weekend'] = sheet_q
 
             if work_exists or commit_missing_files:
                 if existing.file_workday != expected_workfile:
-                    existing.file_workday = expected_workfile
-                    changed = True
+                    changes['file_workday'] = expected_workfile
 
             if week_exists or commit_missing_files:
                 if existing.file_weekend != expected_weekfile:
-                    existing.file_weekend = expected_weekfile
-                    changed = True
+                    changes['file_weekend'] = expected_weekfile
 
-            if changed:
-                existing.updated_at = datetime.utcnow()
-                db.session.add(existing)
+            if changes:
+                updates.append({'id': existing.id, 'updated_at': now, **changes})
                 results['updated'].append(num)
             else:
                 results['skipped'].append(num)
 
         else:
-            route = Route(
-                route_number=num,
-                name=f'Маршрут {num}',
-                sheet_name_workday=sheet_w,
-                sheet_name_weekend=sheet_q,
-                file_workday=(expected_workfile if (work_exists or commit_missing_files) else None),
-                file_weekend=(expected_weekfile if (week_exists or commit_missing_files) else None),
-                is_active=True
-            )
-            db.session.add(route)
+            inserts.append({
+                'route_number': num,
+                'name': f'Маршрут {num}',
+                'sheet_name_workday': sheet_w,
+                'sheet_name_weekend': sheet_q,
+                'file_workday': (expected_workfile if (work_exists or commit_missing_files) else None),
+                'file_weekend': (expected_weekfile if (week_exists or commit_missing_files) else None),
+                'is_active': True,
+                'created_at': now,
+                'updated_at': now,
+            })
             results['added'].append(num)
 
-    db.session.commit()
+    try:
+        # UPDATE по первичному ключу пакетом; строки в разных наборах
+        # полей группируются самим SQLAlchemy
+        if updates:
+            db.session.execute(update(Route), updates)
+        if inserts:
+            db.session.execute(insert(Route), inserts)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
 
     results['final_schedule_sheets_keys'] = list(config.SCHEDULE_SHEETS.keys())
     return results
@@ -0,0 +1,102 @@
+"""
+Векторизованный выбор водителя на слот.
+
+Пул кандидатов дня хранится массивами NumPy по общему индексу водителей
+(конец последней смены в минутах от полуночи текущего дня, код вчерашней
+смены, маска «уже назначен»), и все
+кандидаты оцениваются за один проход на слот. Критерии по порядку:
+    |отдых - REST_HOURS|, штраф за ту же смену, -отдых, табельный номер.
+Отдых — часы от конца вчерашней смены до начала слота; у водителя без
+вчерашней смены он считается равным REST_HOURS, отрицательный — недопустим.
+"""
+import numpy as np
+
+from structure_model.config import REST_HOURS
+from structure_model.shift_parser import MINUTES_IN_DAY
+
+
+class CandidatePool:
+    """
+    Кандидаты на день поверх общего индекса водителей (driver_index).
+    Все массивы длины len(index); members — маска водителей закреплений
+    пула (объединение масок RosterRegistry.masks).
+    """
+
+    def __init__(self, index, members, history):
+        self.driver_index = index
+        self.members = members
+        self.rank = index.rank
+
+        n = len(index)
+        self.has_history = np.zeros(n, dtype=bool)
+        self.last_end_min = np.zeros(n, dtype=np.int64)
+        self.shift_code = np.zeros(n, dtype=np.int8)
+        self.assigned = np.zeros(n, dtype=bool)
+        self.scanned = 0   # просмотрено кандидатов (для profiling)
+
+        for drv, record in history.items():
+            i = index.index.get(drv)
+            if i is None or not self.members[i]:
+                continue
+            self.has_history[i] = True
+            self.shift_code[i] = record.get("shift_code") or 0
+            # Конец вчерашней смены в минутах от полуночи сегодняшнего дня
+            self.last_end_min[i] = record["time"].end_min - MINUTES_IN_DAY
+
+    def mask(self, drivers):
+        """Булева маска для набора табельных (неизвестные игнорируются)."""
+        return self.driver_index.mask(drivers)
+
+    def columns(self):
+        """Позиции водителей пула в порядке табельных номеров."""
+        return self.driver_index.ordered(self.members)
+
+    def rest_hours(self, idx, start_min):
+        """Отдых перед слотом (часы) для кандидатов idx; без истории — REST_HOURS."""
+        seconds = (start_min - self.last_end_min[idx]) * 60
+        rest = seconds.astype(np.float64) / 3600
+        return np.where(self.has_history[idx], rest, REST_HOURS)
+
+    def choose(self, start_min, shift, allowed):
+        """Лучший свободный кандидат из маски allowed или None."""
+        idx = np.flatnonzero(allowed & ~self.assigned)
+        self.scanned += idx.size
+        if not idx.size:
+            return None
+
+        rest = self.rest_hours(idx, start_min)
+        ok = rest >= 0
+        if not ok.any():
+            return None
+        idx, rest = idx[ok], rest[ok]
+
+        deviation = np.abs(rest - REST_HOURS)
+        same_shift = (self.has_history[idx] & (self.shift_code[idx] == shift)).astype(np.int8)
+
+        # lexsort: последний ключ — главный; первый — порядок табельных
+        best = np.lexsort((self.rank[idx], -rest, same_shift, deviation))[0]
+        return self.driver_index.tab_no[idx[best]]
+
+    def assign(self, drv):
+        self.assigned[self.driver_index.index[drv]] = True
+
+    def assign_mask(self, mask):
+        """Пометить назначенными всех водителей пула из маски."""
+        self.assigned |= mask & self.members
+
+
+def assign_greedy(pool, slots, allowed, fallback=None):
+    """
+    Жадное назначение в порядке слотов. slots — [(shift, start_min), ...],
+    allowed — {shift: маска кандидатов}, fallback — маска для вызова сверх плана.
+    Возвращает табельный (или None) для каждого слота.
+    """
+    chosen = []
+    for shift, start_min in slots:
+        drv = pool.choose(start_min, shift, allowed[shift])
+        if not drv and fallback is not None:
+            drv = pool.choose(start_min, shift, fallback)
+        if drv:
+            pool.assign(drv)
+        chosen.append(drv)
+    return chosen
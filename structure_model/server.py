@@ -1,20 +1,34 @@
-from flask import Flask, render_template, request, jsonify, send_file
-import os
+from flask import Flask, render_template, request, jsonify, send_file, g
 import json
+import os
+import time
 import pandas as pd
 import datetime
 from pathlib import Path
 
 from structure_model.config import (
-    TRANSPORT_CONFIGS,
+    TRANSPORTS as TRANSPORT_CONFIGS,
     BASE_DIR,
     TOTAL_DAYS_IN_MONTH,
     FILE_PATH,
     COL_SHIFT_1_INSERT,
     COL_SHIFT_2_INSERT,
-    ABSENCES_FILE
+    ABSENCES_DB,
+    ABSENCES_PAGE_SIZE,
+    ABSENCES_PAGE_MAX,
 )
-from structure_model.driver_scheduler import run_planner as run_planner_for_day, get_all_routes
+from structure_model.day_plan import plan_drivers, plan_path, read_day_plan
+from structure_model.driver_scheduler import plan_day, replan_routes, routes_for_day
+from structure_model.absence_store import absence_store
+from structure_model.incremental import recalculate_after_change
+from structure_model.jobs import job_queue
+from structure_model import metrics
+from structure_model.profiling import COUNTERS, STAGES, profiler
+from structure_model.output_manifest import output_manifest
+from structure_model.response_cache import make_etag, schedule_cache
+from structure_model.roster import roster_registry
+from structure_model.routes_sync import route_sort_key
+from structure_model.utils import file_stamp
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'json-only-version'
@@ -22,19 +36,110 @@ app.config['SECRET_KEY'] = 'json-only-version'
 # =========================================================
 # Вспомогательные функции
 # =========================================================
-def load_absences():
-    if not os.path.exists(ABSENCES_FILE):
-        return []
-    try:
-        with open(ABSENCES_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return []
+def enqueue_absence_recalc(day, tab_no):
+    """Ставит инкрементальный пересчёт после изменения отсутствий в очередь."""
+    return job_queue.submit(
+        "absence", ("absence", day, tab_no),
+        recalculate_after_change, day, [tab_no],
+        params={
+            "day": day,
+            "tab_no": tab_no,
+            # Маршруты из закреплений водителя — что затронет пересчёт
+            "routes": [f"{t}/{r}" for t, r in sorted(roster_registry.routes_of(tab_no))],
+        },
+    )
+
+
+def job_accepted(job, **extra):
+    """Ответ 202 с id задачи и адресом для опроса."""
+    return jsonify({
+        "success": True,
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": f"/api/jobs/{job['id']}",
+        **extra,
+    }), 202
+
+
+SCHEDULE_COLUMNS = [
+    "Номер маршрута",
+    "Отправление 1 смена",
+    "Прибытие 1 смена",
+    "Водитель 1 смена",
+    "Отправление 2 смена",
+    "Прибытие 2 смена",
+    "Водитель 2 смена",
+]
+
+
+# Базовые расписания маршрутов: путь -> (отметка файла, строки)
+_base_rows = {}
+
+
+def read_base_rows(filepath):
+    """Непустые строки базового расписания (с 4-й), читаются один раз на версию файла."""
+    stamp = file_stamp(filepath)
+    cached = _base_rows.get(filepath)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    df = pd.read_excel(filepath, sheet_name="Лист1", header=None)
+    rows = [
+        (i, row) for i, row in
+        ((i, df.iloc[i].fillna('').tolist()) for i in range(3, len(df)))
+        if any(str(c).strip() for c in row)
+    ]
+    _base_rows[filepath] = (stamp, rows)
+    return rows
+
+
+def read_itog_drivers(itog_path):
+    """Водители по строкам (0-based) из Расписание_Итог_*.xlsx — для старых дней без JSON."""
+    drivers_s1 = {}
+    drivers_s2 = {}
 
+    if itog_path.exists():
+        try:
+            itog_df = pd.read_excel(itog_path, sheet_name="Расписание", header=None)
 
-def save_absences(data):
-    with open(ABSENCES_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+            col1 = COL_SHIFT_1_INSERT - 1
+            col2 = COL_SHIFT_2_INSERT - 1
+
+            for idx in range(len(itog_df)):
+                if col1 < itog_df.shape[1]:
+                    v1 = itog_df.iat[idx, col1]
+                    if v1 and str(v1).strip() != "НЕТ_РЕЗЕРВА" and str(v1).strip() != "НЕТ":
+                        drivers_s1[idx] = str(v1).strip()
+
+                if col2 < itog_df.shape[1]:
+                    v2 = itog_df.iat[idx, col2]
+                    if v2 and str(v2).strip() != "НЕТ_РЕЗЕРВА" and str(v2).strip() != "НЕТ":
+                        drivers_s2[idx] = str(v2).strip()
+
+        except Exception as e:
+            print(f"[WARN] Не удалось прочитать итог: {e}")
+
+    return drivers_s1, drivers_s2
+
+
+def read_schedule_rows(filepath, source):
+    """
+    Строки базового расписания маршрута с водителями дня. source — JSON
+    планировщика (day_plan) или, для старых дней, Расписание_Итог_*.xlsx.
+    """
+    plan = read_day_plan(source) if source.suffix == ".json" else None
+    if plan is not None:
+        # Строки Excel 1-based -> индексы строк листа
+        s1, s2 = plan_drivers(plan)
+        drivers_s1 = {row - 1: drv for row, drv in s1.items()}
+        drivers_s2 = {row - 1: drv for row, drv in s2.items()}
+    else:
+        drivers_s1, drivers_s2 = read_itog_drivers(source.with_suffix(".xlsx"))
+
+    return [
+        row + [drivers_s1.get(i, ""), drivers_s2.get(i, "")]
+        for i, row in read_base_rows(filepath)
+    ]
 
 
 # =========================================================
@@ -49,8 +154,7 @@ def dashboard():
         df = pd.read_excel(report_path, index_col=0)
         base_count = len(df)
 
-    real_absences = load_absences()
-    unique_absent_drivers = len(set(item['tab_no'] for item in real_absences))
+    unique_absent_drivers = absence_store.count_drivers()
     statistical_absent = round(base_count * 0.217)
 
     return render_template(
@@ -68,24 +172,8 @@ def dashboard():
 # =========================================================
 @app.route('/calendar-data')
 def calendar_data():
-    days_with_schedules = set()
-
-    # Обходим все output-каталоги по транспортам
-    for cfg in TRANSPORT_CONFIGS.values():
-        output_root: Path = Path(cfg["output_dir"])
-        if not output_root.exists():
-            continue
-
-        for entry in os.listdir(output_root):
-            route_path = output_root / entry
-            if not route_path.is_dir():
-                continue
-            for day in range(1, TOTAL_DAYS_IN_MONTH + 1):
-                fname = f"Расписание_Итог_{day}.xlsx"
-                if (route_path / fname).exists():
-                    days_with_schedules.add(day)
-
-    return jsonify(sorted(days_with_schedules))
+    # Дни с итогами хотя бы одного маршрута — из манифеста планировщика
+    return jsonify([d for d in output_manifest.days() if 1 <= d <= TOTAL_DAYS_IN_MONTH])
 
 
 # =========================================================
@@ -94,65 +182,70 @@ def calendar_data():
 @app.route('/submit-absence', methods=['POST'])
 def submit_absence():
     data = request.json
-    absences = load_absences()
 
-    absences.append({
+    record = {
         "tab_no": str(data.get("tab_no")).strip(),
         "shift": int(data.get("shift")),
         "day": int(data.get("day")),
         "reason": str(data.get("reason", "")),
-    })
-
-    save_absences(absences)
+    }
+    absence_id = absence_store.add(**record)
 
-    day = int(data.get("day"))
-    prev_day = max(day - 1, 0)
+    # Пересчёт только маршрутов этого водителя и дальше по дням, пока есть изменения
+    job, _ = enqueue_absence_recalc(record["day"], record["tab_no"])
 
-    # Пересчёт для всех маршрутов всех типов (можно оптимизировать)
-    for transport, cfg in TRANSPORT_CONFIGS.items():
-        sheets = cfg["sheets"]
-        routes = sorted({k[0] for k in sheets.keys()})
-        for route_number in routes:
-            run_planner_for_day(day, prev_day, route_number, transport)
-
-    return jsonify({"success": True})
+    return job_accepted(job, id=absence_id, message="Отсутствие сохранено, расписание пересчитывается")
 
 
 @app.route('/delete-absence', methods=['POST'])
 def delete_absence():
     data = request.json
-    index = data.get("id")
+    try:
+        absence_id = int(data.get("id"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Некорректный id"}), 400
 
-    absences = load_absences()
-    if index < 0 or index >= len(absences):
+    record = absence_store.delete(absence_id)
+    if record is None:
         return jsonify({"error": "Запись не найдена"}), 404
 
-    day = absences[index]["day"]
-    absences.pop(index)
-    save_absences(absences)
+    job, _ = enqueue_absence_recalc(int(record["day"]), str(record["tab_no"]).strip())
 
-    prev_day = max(day - 1, 0)
-    for transport, cfg in TRANSPORT_CONFIGS.items():
-        sheets = cfg["sheets"]
-        routes = sorted({k[0] for k in sheets.keys()})
-        for route_number in routes:
-            run_planner_for_day(day, prev_day, route_number, transport)
-
-    return jsonify({"success": True})
+    return job_accepted(job, message="Запись удалена, расписание пересчитывается")
 
 
 @app.route('/get-real-absences')
 def get_real_absences():
-    absences = load_absences()
-    return [
-        {**item, "id": idx}
-        for idx, item in enumerate(absences)
-    ]
+    """Страница записей: ?page=1&per_page=50&order=asc|desc (desc — новые первыми)."""
+    try:
+        page = max(int(request.args.get("page", 1)), 1)
+        per_page = min(max(int(request.args.get("per_page", ABSENCES_PAGE_SIZE)), 1), ABSENCES_PAGE_MAX)
+    except ValueError:
+        return jsonify({"error": "page и per_page должны быть числами"}), 400
+
+    items, total = absence_store.page(page, per_page, newest_first=request.args.get("order") == "desc")
+    return jsonify({
+        "items": items,
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "pages": (total + per_page - 1) // per_page,
+    })
 
 
 # =========================================================
 # ПЕРЕСЧЁТ
 # =========================================================
+def recalculate_day(day, transports, route=None, progress=None):
+    """Пересчёт дня: все маршруты транспортов или один маршрут."""
+    for t in transports:
+        if route is None:
+            plan_day(day, t, progress=progress)
+        else:
+            replan_routes(day, t, [route], progress=progress)
+    return {"day": day, "transports": list(transports), "route": route}
+
+
 @app.route('/api/recalculate/<int:day>', methods=['POST'])
 def api_recalculate(day):
     if day < 1 or day > TOTAL_DAYS_IN_MONTH:
@@ -162,37 +255,51 @@ def api_recalculate(day):
     route = data.get("route")
     transport = data.get("transport")  # optional: "bus" | "obus" | "tram"
 
-    prev_day = max(day - 1, 0)
+    if transport and transport not in TRANSPORT_CONFIGS:
+        return jsonify({'error': f'Неизвестный транспорт {transport}'}), 400
 
     if route is None:
         # пересчёт для всех маршрутов (возможно ограничить транспорт)
-        if transport:
-            sheets = TRANSPORT_CONFIGS.get(transport, {}).get("sheets", {})
-            for route_number in sorted({k[0] for k in sheets.keys()}):
-                run_planner_for_day(day, prev_day, route_number, transport)
-        else:
-            for t, cfg in TRANSPORT_CONFIGS.items():
-                sheets = cfg["sheets"]
-                for route_number in sorted({k[0] for k in sheets.keys()}):
-                    run_planner_for_day(day, prev_day, route_number, t)
+        transports = [transport] if transport else list(TRANSPORT_CONFIGS)
+        total = sum(len(routes_for_day(t, day)) for t in transports)
     else:
         # пересчёт конкретного маршрута (с учётом типа транспорта)
-        route_number = int(route)
+        route = str(route).strip()
         if transport:
-            run_planner_for_day(day, prev_day, route_number, transport)
+            transports = [transport]
         else:
-            # пытаемся угадать транспорт по SCHEDULE_SHEETS
-            found = False
-            for t, cfg in TRANSPORT_CONFIGS.items():
-                if (route_number, True) in cfg["sheets"] or (route_number, False) in cfg["sheets"]:
-                    run_planner_for_day(day, prev_day, route_number, t)
-                    found = True
-            if not found:
-                # fallback: запустить для всех (маловероятно)
-                for t in TRANSPORT_CONFIGS.keys():
-                    run_planner_for_day(day, prev_day, route_number, t)
+            # ищем транспорт по карте листов
+            transports = [
+                t for t, cfg in TRANSPORT_CONFIGS.items()
+                if (route, True) in cfg["sheets"] or (route, False) in cfg["sheets"]
+            ]
+        if not transports:
+            return jsonify({'error': f'Маршрут {route} не найден ни для одного транспорта'}), 400
+        total = len(transports)
+
+    job, _ = job_queue.submit(
+        "recalculate", ("recalculate", day, tuple(transports), route),
+        recalculate_day, day, transports, route,
+        params={"day": day, "transports": transports, "route": route},
+        total=total,
+    )
+    return job_accepted(job)
+
+
+# =========================================================
+# ФОНОВЫЕ ЗАДАЧИ
+# =========================================================
+@app.route('/api/jobs')
+def api_jobs():
+    return jsonify({"depth": job_queue.depth(), "jobs": job_queue.list()})
 
-    return jsonify({"success": True})
+
+@app.route('/api/jobs/<job_id>')
+def api_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Задача не найдена'}), 404
+    return jsonify(job)
 
 
 # =========================================================
@@ -202,21 +309,26 @@ def api_recalculate(day):
 def api_routes():
     """
     Возвращает список маршрутов с указанием типа транспорта:
-    [{ "route": 55, "transport": "bus" }, ...]
+    [{ "route": "55", "transport": "tram" }, { "route": "93тб", ... }, ...]
+    Номера — строки, как ключи листов в конфигурации.
     """
-    out = []
-    for transport, cfg in TRANSPORT_CONFIGS.items():
-        for (r, _) in cfg["sheets"].keys():
-            out.append({"route": int(r), "transport": transport})
-    # сортируем по номеру и по транспорту
-    out = sorted(out, key=lambda x: (x["route"], x["transport"]))
+    keys = {
+        (r, transport)
+        for transport, cfg in TRANSPORT_CONFIGS.items()
+        for (r, _) in cfg["sheets"].keys()
+    }
+    # сортируем по номеру ("9" < "10" < "93тб") и по транспорту
+    out = [
+        {"route": r, "transport": transport}
+        for r, transport in sorted(keys, key=lambda k: (route_sort_key(k[0]), k[1]))
+    ]
     return jsonify(out)
 
 
 # =========================================================
 # РАСПИСАНИЕ
 # =========================================================
-@app.route('/api/schedule/<int:day>/<int:route>')
+@app.route('/api/schedule/<int:day>/<route>')
 def api_schedule(day, route):
     if day < 1 or day > TOTAL_DAYS_IN_MONTH:
         return jsonify({'error': 'Некорректный день'}), 400
@@ -224,13 +336,17 @@ def api_schedule(day, route):
     # optional query param ?transport=obus
     transport = request.args.get("transport", None)
 
+    # ключи листов в конфигурации — строки ("9", "93тб"); неизвестный
+    # маршрут отсекается проверкой по cfg["sheets"] ниже
+    route_key = route.strip()
+
     # определяем транспорт (если не задан)
     selected_transport = None
     if transport:
         selected_transport = transport if transport in TRANSPORT_CONFIGS else None
     else:
         for t, cfg in TRANSPORT_CONFIGS.items():
-            if (route, True) in cfg["sheets"] or (route, False) in cfg["sheets"]:
+            if (route_key, True) in cfg["sheets"] or (route_key, False) in cfg["sheets"]:
                 selected_transport = t
                 break
 
@@ -245,77 +361,46 @@ def api_schedule(day, route):
     current_date = datetime.date.today().replace(day=day)
     is_weekend = current_date.weekday() >= 5
 
-    sheet_name = sheets.get((route, is_weekend))
+    sheet_name = sheets.get((route_key, is_weekend))
     if not sheet_name:
         return jsonify({'error': f'Маршрут {route} не найден для транспорта {selected_transport}'}), 400
 
-    # ---------- читаем базовое расписание ----------
+    # ---------- файлы расписания ----------
     if is_weekend:
-        filename = f"Расписание_выходного_дня_{route}.xlsx"
+        filename = f"Расписание_выходного_дня_{route_key}.xlsx"
     else:
-        filename = f"Расписание_рабочего_дня_{route}.xlsx"
+        filename = f"Расписание_рабочего_дня_{route_key}.xlsx"
 
     filepath = output_root / filename
-    if not filepath.exists():
+    # Водители дня: JSON планировщика, для старых дней — Excel
+    source = plan_path(output_root / route_key, day)
+    if not source.exists():
+        source = output_root / route_key / f"Расписание_Итог_{day}.xlsx"
+
+    # Ключ кэша и ETag — по отметкам обоих файлов, сами файлы пока не читаем
+    key = (selected_transport, route_key, day)
+    stamps = (file_stamp(filepath), file_stamp(source))
+    if stamps[0] is None:
         return jsonify({'error': f'Файл {filename} не найден в {output_root}'}), 404
 
-    df = pd.read_excel(filepath, sheet_name="Лист1", header=None)
-
-    # ---------- читаем итог (водителей) ----------
-    drivers_s1 = {}
-    drivers_s2 = {}
-
-    itog_path = output_root / str(route) / f"Расписание_Итог_{day}.xlsx"
-
-    if itog_path.exists():
-        try:
-            itog_df = pd.read_excel(itog_path, sheet_name="Расписание", header=None)
-
-            col1 = COL_SHIFT_1_INSERT - 1
-            col2 = COL_SHIFT_2_INSERT - 1
-
-            for idx in range(len(itog_df)):
-                if col1 < itog_df.shape[1]:
-                    v1 = itog_df.iat[idx, col1]
-                    if v1 and str(v1).strip() != "НЕТ_РЕЗЕРВА" and str(v1).strip() != "НЕТ":
-                        drivers_s1[idx] = str(v1).strip()
-
-                if col2 < itog_df.shape[1]:
-                    v2 = itog_df.iat[idx, col2]
-                    if v2 and str(v2).strip() != "НЕТ_РЕЗЕРВА" and str(v2).strip() != "НЕТ":
-                        drivers_s2[idx] = str(v2).strip()
-
-        except Exception as e:
-            print(f"[WARN] Не удалось прочитать итог: {e}")
-
-    # ---------- собираем строки ----------
-    rows = []
-
-    for i in range(3, len(df)):
-        base_row = df.iloc[i].fillna('').tolist()
-
-        if any(str(c).strip() for c in base_row):
-            base_row.append(drivers_s1.get(i, ""))
-            base_row.append(drivers_s2.get(i, ""))
-            rows.append(base_row)
-
-    return jsonify({
-        "success": True,
-        "day": day,
-        "route": route,
-        "transport": selected_transport,
-        "is_weekend": is_weekend,
-        "rows": rows,
-        "columns": [
-            "Номер маршрута",
-            "Отправление 1 смена",
-            "Прибытие 1 смена",
-            "Водитель 1 смена",
-            "Отправление 2 смена",
-            "Прибытие 2 смена",
-            "Водитель 2 смена",
-        ]
-    })
+    payload = schedule_cache.get(key, stamps)
+    if payload is None:
+        payload = json.dumps({
+            "success": True,
+            "day": day,
+            "route": route_key,
+            "transport": selected_transport,
+            "is_weekend": is_weekend,
+            "rows": read_schedule_rows(filepath, source),
+            "columns": SCHEDULE_COLUMNS,
+        }, ensure_ascii=False, default=str)
+        schedule_cache.put(key, stamps, payload)
+
+    response = app.response_class(payload, mimetype="application/json")
+    response.set_etag(make_etag(key, stamps))
+    response.last_modified = max(s[0] for s in stamps if s) / 1e9
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 
 # =========================================================
@@ -335,6 +420,89 @@ def get_report():
     return send_file(path, as_attachment=True)
 
 
+# =========================================================
+# МЕТРИКИ (Prometheus, текстовый формат)
+# =========================================================
+REQUESTS = metrics.counter(
+    "planner_http_requests_total",
+    "HTTP-запросы по эндпоинтам.",
+    ("endpoint", "method", "status"),
+)
+REQUEST_LATENCY = metrics.histogram(
+    "planner_http_request_duration_seconds",
+    "Время ответа по эндпоинтам.",
+    ("endpoint", "method"),
+)
+
+
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _record_request(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else "<unmatched>"
+        REQUESTS.inc(endpoint, request.method, str(response.status_code))
+        REQUEST_LATENCY.observe(time.perf_counter() - started, endpoint, request.method)
+    return response
+
+
+@metrics.register_collector
+def _service_metrics():
+    try:
+        absences_bytes = os.stat(ABSENCES_DB).st_size
+    except OSError:
+        absences_bytes = 0
+    return (
+        metrics.sample_lines(
+            "planner_job_queue_depth", "Задачи пересчёта в очереди и в работе.",
+            "gauge", [((), job_queue.depth())],
+        )
+        + metrics.sample_lines(
+            "planner_absences_db_bytes", "Размер базы отсутствий.",
+            "gauge", [((), absences_bytes)],
+        )
+        + metrics.sample_lines(
+            "planner_absences_records", "Записей об отсутствиях.",
+            "gauge", [((), absence_store.count())],
+        )
+        + metrics.sample_lines(
+            "planner_schedule_cache_entries", "Ответов /api/schedule в кэше.",
+            "gauge", [((), len(schedule_cache))],
+        )
+    )
+
+
+@metrics.register_collector
+def _planner_metrics():
+    # Замеры планировщика в этом процессе (profiling); route="" — этапы уровня дня
+    totals = profiler.totals(by=lambda key: (key[1] or "", key[2] or ""))
+    lines = metrics.sample_lines(
+        "planner_stage_seconds_total", "Время этапов планировщика по маршрутам.", "counter",
+        [
+            ((transport, route, stage), round(acc[stage], 6))
+            for (transport, route), acc in sorted(totals.items())
+            for stage in STAGES if stage in acc
+        ],
+        ("transport", "route", "stage"),
+    )
+    for name in COUNTERS:
+        lines += metrics.sample_lines(
+            f"planner_route_{name}_total", f"Счётчик {name} планировщика по маршрутам.", "counter",
+            [(key, int(acc[name])) for key, acc in sorted(totals.items()) if name in acc],
+            ("transport", "route"),
+        )
+    return lines
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return app.response_class(metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+
 # =========================================================
 if __name__ == "__main__":
     app.run(debug=True, port=5000)
@@ -0,0 +1,118 @@
+"""
+Каталог листов XLSX без загрузки книги.
+
+Имена и sheetId листов читаются только из xl/workbook.xml внутри zip:
+миллисекунды при любом размере книги (pd.ExcelFile и load_workbook
+разбирают всю книгу). Результат кэшируется по mtime/размеру файла.
+
+На каталоге построены поиск маршрутов (routes_sync) и проверка
+конфигурации: все ли листы из TRANSPORTS[...]["sheets"] есть в книге
+транспорта TRANSPORTS[...]["file"]; маршруты без листа планировщик
+пропускает.
+
+    python -m structure_model.sheet_catalog [файл.xlsx]
+"""
+import argparse
+import os
+import sys
+import threading
+import zipfile
+from collections import namedtuple
+from xml.etree import ElementTree
+
+from structure_model.config import FILE_PATH, TRANSPORTS
+from structure_model.utils import file_stamp
+
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+# state: "visible", "hidden" или "veryHidden"
+SheetInfo = namedtuple("SheetInfo", ["name", "sheet_id", "rel_id", "state"])
+
+# Путь -> ((mtime_ns, размер), каталог)
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def _parse_workbook_xml(data):
+    root = ElementTree.fromstring(data)
+    sheets = root.find(f"{_MAIN_NS}sheets")
+    if sheets is None:
+        return []
+    return [
+        SheetInfo(
+            name=sheet.get("name"),
+            sheet_id=int(sheet.get("sheetId")),
+            rel_id=sheet.get(f"{_REL_NS}id"),
+            state=sheet.get("state", "visible"),
+        )
+        for sheet in sheets.iter(f"{_MAIN_NS}sheet")
+    ]
+
+
+def read_sheet_catalog(file_path=FILE_PATH):
+    """Листы книги в порядке вкладок: список SheetInfo."""
+    path = os.fspath(file_path)
+    stamp = file_stamp(path)
+    if stamp is None:
+        raise FileNotFoundError(f"Нет файла {path}")
+
+    cached = _catalogs.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    with zipfile.ZipFile(path) as zf:
+        catalog = _parse_workbook_xml(zf.read("xl/workbook.xml"))
+
+    with _catalogs_lock:
+        _catalogs[path] = (stamp, catalog)
+    return catalog
+
+
+def sheet_names(file_path=FILE_PATH):
+    """Имена листов в порядке вкладок."""
+    return [sheet.name for sheet in read_sheet_catalog(file_path)]
+
+
+def missing_sheets(transports=TRANSPORTS):
+    """
+    Листы из конфигурации транспорта, которых нет в его книге (cfg["file"]):
+    {transport: [(route, is_weekend, имя листа), ...]} (только непустые).
+    """
+    missing = {}
+    for transport, cfg in transports.items():
+        names = set(sheet_names(cfg["file"]))
+        absent = [
+            (route, is_weekend, sheet)
+            for (route, is_weekend), sheet in cfg["sheets"].items()
+            if sheet not in names
+        ]
+        if absent:
+            missing[transport] = absent
+    return missing
+
+
+def validate_transport_sheets(transports=TRANSPORTS):
+    """Печатает предупреждения о листах конфигурации, которых нет в книгах; True — всё на месте."""
+    missing = missing_sheets(transports)
+    for transport, absent in missing.items():
+        file_name = os.path.basename(os.fspath(transports[transport]["file"]))
+        print(f"[WARN] {transport}: в {file_name} нет листов ({len(absent)}):")
+        for route, is_weekend, sheet in absent:
+            day_type = "выходной" if is_weekend else "будни"
+            print(f"         маршрут {route} ({day_type}): {sheet}")
+    return not missing
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Листы книги и проверка конфигурации транспорта")
+    parser.add_argument("file", nargs="?", default=FILE_PATH)
+    args = parser.parse_args()
+
+    for sheet in read_sheet_catalog(args.file):
+        state = "" if sheet.state == "visible" else f" ({sheet.state})"
+        print(f"{sheet.sheet_id:>4}  {sheet.name}{state}")
+
+    if not validate_transport_sheets():
+        sys.exit(1)
+    print("[INFO] Все листы конфигурации найдены")
@@ -1,51 +1,128 @@
-import re
-from datetime import datetime, timedelta
+"""
+Время смен в минутах от полуночи.
+
+ShiftTime хранит начало и конец смены целыми минутами от полуночи дня смены;
+конец >= 24*60 означает, что смена заканчивается на следующий день. Результат
+не зависит от момента запуска (раньше время привязывалось к datetime.now()).
+
+Ячейки листа разбираются один раз: parse_shift_columns обрабатывает столбцы
+начала/конца целиком и возвращает массив SHIFT_DTYPE.
+"""
+import numpy as np
 import pandas as pd
 
-def get_shift_info_from_two_cols(start_val, end_val):
-    if pd.isna(start_val) or pd.isna(end_val):
-        return None
-    try:
-        start_str = str(start_val).strip().split()[0]
-        end_str = str(end_val).strip().split()[0]
-        match_start = re.search(r'(\d{1,2})[:\.\-](\d{2})', start_str)
-        match_end = re.search(r'(\d{1,2})[:\.\-](\d{2})', end_str)
-        if not match_start or not match_end:
-            return None
-        h1, m1 = map(int, match_start.groups())
-        h2, m2 = map(int, match_end.groups())
-        now = datetime.now().replace(second=0, microsecond=0)
-        start_dt = now.replace(hour=h1, minute=m1)
-        end_dt = now.replace(hour=h2, minute=m2)
-        is_next_day = False
-        if end_dt < start_dt:
-            end_dt += timedelta(days=1)
-            is_next_day = True
-        duration = (end_dt - start_dt).total_seconds() / 3600
-        return {
-            'start_dt': start_dt,
-            'end_dt': end_dt,
-            'start_str': f"{h1:02}:{m1:02}",
-            'end_str': f"{h2:02}:{m2:02}",
-            'duration': round(duration, 2),
-            'is_next_day': is_next_day
-        }
-    except:
-        return None
-
-
-def calculate_rest_duration(end_str_N, is_next_day_N, start_str_N1):
-    try:
-        h_end, m_end = map(int, end_str_N.split(':'))
-        h_start, m_start = map(int, start_str_N1.split(':'))
-        base_dt = datetime.now().replace(second=0, microsecond=0)
-        end_dt_N = base_dt.replace(hour=h_end, minute=m_end)
-        if not is_next_day_N:
-            end_dt_N -= timedelta(days=1)
-        start_dt_N1 = base_dt.replace(hour=h_start, minute=m_start)
-        while start_dt_N1 <= end_dt_N:
-            start_dt_N1 += timedelta(days=1)
-        rest_duration = (start_dt_N1 - end_dt_N).total_seconds() / 3600
-        return round(rest_duration, 1)
-    except:
-        return "Н/Д"
\ No newline at end of file
+MINUTES_IN_DAY = 24 * 60
+
+# "5:10", "05.10", "05-10", "05:10:00"; берётся первое слово ячейки
+TIME_PATTERN = r'(\d{1,2})[:\.\-](\d{2})'
+
+SHIFT_DTYPE = np.dtype([
+    ("start_min", np.int16),
+    ("end_min", np.int16),     # с учётом перехода через полночь (до 2*24*60)
+    ("valid", np.bool_),
+])
+
+
+def _hhmm(minutes):
+    minutes %= MINUTES_IN_DAY
+    return f"{minutes // 60:02}:{minutes % 60:02}"
+
+
+def _to_minutes(hhmm):
+    h, m = map(int, str(hhmm).split(":"))
+    return h * 60 + m
+
+
+class ShiftTime:
+    __slots__ = ("start_min", "end_min")
+
+    def __init__(self, start_min, end_min):
+        self.start_min = int(start_min)
+        self.end_min = int(end_min)
+
+    @classmethod
+    def from_clock(cls, start_min, end_min, is_next_day=None):
+        """
+        Из времени на часах (минуты 0..1439). Если is_next_day не задан,
+        смена переходит через полночь, когда конец раньше начала.
+        """
+        if is_next_day is None:
+            is_next_day = end_min < start_min
+        return cls(start_min, end_min + (MINUTES_IN_DAY if is_next_day else 0))
+
+    @classmethod
+    def from_hhmm(cls, start_str, end_str, is_next_day=None):
+        return cls.from_clock(_to_minutes(start_str), _to_minutes(end_str), is_next_day)
+
+    @property
+    def is_next_day(self):
+        return self.end_min >= MINUTES_IN_DAY
+
+    @property
+    def duration(self):
+        """Длительность в часах, округлённая до сотых."""
+        return round((self.end_min - self.start_min) / 60, 2)
+
+    @property
+    def start_str(self):
+        return _hhmm(self.start_min)
+
+    @property
+    def end_str(self):
+        return _hhmm(self.end_min)
+
+    def __eq__(self, other):
+        if not isinstance(other, ShiftTime):
+            return NotImplemented
+        return (self.start_min, self.end_min) == (other.start_min, other.end_min)
+
+    def __hash__(self):
+        return hash((self.start_min, self.end_min))
+
+    def __repr__(self):
+        suffix = " (+1)" if self.is_next_day else ""
+        return f"ShiftTime({self.start_str}-{self.end_str}{suffix})"
+
+
+# =============================================================================
+# РАЗБОР ЯЧЕЕК
+# =============================================================================
+
+def _clock_minutes(values):
+    """Минуты от полуночи по столбцу ячеек; NaN — если время не распознано."""
+    s = pd.Series(list(values), dtype=object)
+    text = s.where(s.notna(), "").astype(str).str.strip()
+    missing = text == ""
+    if missing.all():
+        # Пустой блок смены: .str[0] дал бы столбец без строк
+        return np.full(len(s), np.nan)
+    words = text.str.split().str[0].fillna("").astype(str)
+    parts = words.str.extract(TIME_PATTERN).apply(pd.to_numeric)
+    h, m = parts[0], parts[1]
+    ok = ~missing & h.notna() & (h <= 23) & (m <= 59)
+    return (h * 60 + m).where(ok).to_numpy(dtype=np.float64)
+
+
+def parse_shift_columns(start_values, end_values):
+    """Столбцы начала и конца смен -> массив SHIFT_DTYPE (valid=False для пустых/битых)."""
+    start = _clock_minutes(start_values)
+    end = _clock_minutes(end_values)
+
+    out = np.zeros(len(start), dtype=SHIFT_DTYPE)
+    valid = ~np.isnan(start) & ~np.isnan(end)
+    out["valid"] = valid
+    start_min = np.where(valid, start, 0).astype(np.int16)
+    end_min = np.where(valid, end, 0).astype(np.int16)
+    out["start_min"] = start_min
+    out["end_min"] = end_min + np.where(end_min < start_min, MINUTES_IN_DAY, 0)
+    return out
+
+
+def rest_minutes(end_min, next_start_min):
+    """
+    Отдых между концом смены дня N (end_min от полуночи дня N) и ближайшим
+    после него началом смены дня N+1 (next_start_min от полуночи дня N+1).
+    Работает и со скалярами, и с массивами.
+    """
+    rest = np.asarray(next_start_min) + MINUTES_IN_DAY - np.asarray(end_min)
+    return np.where(rest <= 0, rest + MINUTES_IN_DAY, rest)
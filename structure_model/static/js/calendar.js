@@ -1,8 +1,23 @@
 // globals for currently displayed month/year and selected route state
 let currentYear, currentMonth;
 let selectedRoute = "55";
+let selectedTransport = "";
 let lastLoadedDay = null;
 
+const TRANSPORT_LABELS = { tram: "трамвай", obus: "троллейбус" };
+
+// Номера маршрутов — строки ("9", "93тб"); один номер бывает у разных транспортов,
+// поэтому транспорт выбранного пункта хранится в data-transport
+function selectedTransportOf(routeSelect) {
+  const opt = routeSelect && routeSelect.selectedOptions[0];
+  return (opt && opt.dataset.transport) || selectedTransport;
+}
+
+function scheduleUrl(day) {
+  const query = selectedTransport ? `?transport=${encodeURIComponent(selectedTransport)}` : "";
+  return `/api/schedule/${day}/${encodeURIComponent(selectedRoute)}${query}`;
+}
+
 function initCalendar() {
   const now = new Date();
   currentYear = now.getFullYear();
@@ -35,26 +50,34 @@ function initCalendar() {
           routeSelect.appendChild(opt);
           routeSelect.disabled = true;
         } else {
-          routes.forEach((rn) => {
+          let matched = false;
+          routes.forEach((item) => {
+            const route = String(item.route);
             const opt = document.createElement("option");
-            opt.value = String(rn);
-            opt.textContent = `Маршрут ${rn}`;
-            // выбираем, если совпадает с выбранным (например 55)
-            if (String(rn) === String(selectedRoute)) opt.selected = true;
+            opt.value = route;
+            opt.dataset.transport = item.transport;
+            opt.textContent = `Маршрут ${route} (${TRANSPORT_LABELS[item.transport] || item.transport})`;
+            // выбираем первый совпавший с выбранным (например 55)
+            if (!matched && route === String(selectedRoute)) {
+              opt.selected = true;
+              matched = true;
+            }
             routeSelect.appendChild(opt);
           });
 
           // если ни один не был выбран, выбираем первый
-          if (!routeSelect.value) {
-            routeSelect.value = String(routes[0]);
+          if (!matched) {
+            routeSelect.selectedIndex = 0;
           }
           selectedRoute = routeSelect.value;
+          selectedTransport = selectedTransportOf(routeSelect);
           routeSelect.disabled = false;
         }
 
         // слушатель изменения маршрута
         routeSelect.addEventListener("change", () => {
           selectedRoute = routeSelect.value;
+          selectedTransport = selectedTransportOf(routeSelect);
           if (lastLoadedDay) {
             loadSchedule(lastLoadedDay, true);
           }
@@ -267,6 +290,7 @@ function loadSchedule(day, skipLoadingMessage) {
 const routeSelect = document.getElementById("routeSelect");
 if (routeSelect) {
   selectedRoute = routeSelect.value || "55";
+  selectedTransport = selectedTransportOf(routeSelect);
 }
 
 
@@ -277,7 +301,7 @@ if (routeSelect) {
   lastLoadedDay = parseInt(day, 10);
   updateRouteHint();
 
-  fetch(`/api/schedule/${day}/${selectedRoute}`)
+  fetch(scheduleUrl(day))
     .then((response) => response.json())
     .then((data) => {
       if (!data || !data.success) {
@@ -436,13 +460,55 @@ function requestRecalculateIfNeeded(day) {
 
   const routeSelect = document.getElementById("routeSelect");
   const route = routeSelect ? routeSelect.value : selectedRoute;
+  const transport = routeSelect ? selectedTransportOf(routeSelect) : selectedTransport;
+
+  const display = document.getElementById("scheduleDisplay");
+  if (display) {
+    display.innerHTML = "<p>Пересчёт расписания...</p>";
+  }
 
   return fetch(`/api/recalculate/${day}`, {
     method: "POST",
     headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ route: route }),
-  }).catch(err => {
-    console.error("Не удалось пересчитать расписание:", err);
+    body: JSON.stringify(transport ? { route: route, transport: transport } : { route: route }),
+  })
+    .then((response) => response.json())
+    .then((data) => {
+      if (data && data.job_id) {
+        return waitForJob(data.job_id, (job) => {
+          if (display && job.progress && job.progress.total) {
+            display.innerHTML = `<p>Пересчёт расписания... ${job.progress.done} из ${job.progress.total}</p>`;
+          }
+        });
+      }
+    })
+    .catch(err => {
+      console.error("Не удалось пересчитать расписание:", err);
+    });
+}
+
+// Опрос фоновой задачи до завершения (done/failed)
+function waitForJob(jobId, onProgress, intervalMs = 1000) {
+  return new Promise((resolve, reject) => {
+    const poll = () => {
+      fetch(`/api/jobs/${jobId}`)
+        .then((response) => {
+          if (!response.ok) throw new Error("Задача не найдена");
+          return response.json();
+        })
+        .then((job) => {
+          if (onProgress) onProgress(job);
+          if (job.status === "done") {
+            resolve(job);
+          } else if (job.status === "failed") {
+            reject(new Error(job.error || "Пересчёт завершился с ошибкой"));
+          } else {
+            setTimeout(poll, intervalMs);
+          }
+        })
+        .catch(reject);
+    };
+    poll();
   });
 }
 
@@ -0,0 +1,107 @@
+"""
+Табель (лист Весь_табель), разобранный один раз.
+
+Статусы ячеек переводятся в матрицу кодов водитель x день:
+    1, 2, ... — смена (первая цифра статуса), STATUS_WEEKEND — выходной
+    (WEEKEND_CODE), STATUS_OTHER — всё остальное.
+Списки «кто в смену k в день d» строятся один раз на пару (d, k) и дальше
+отдаются из памяти. Один экземпляр на версию книги (get_timesheet) делят
+планировщик, excel_io и отчёты.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from structure_model.config import FILE_PATH, TAB_SHEET_NAME, WEEKEND_CODE
+from structure_model.metrics import cache_lookup
+from structure_model.workbook_cache import compile_timesheet, get_compiled_workbook
+
+STATUS_OTHER = 0
+STATUS_WEEKEND = -1
+
+MAX_DAYS = 31
+
+
+def _status_code(status):
+    if "1" <= status[:1] <= "9":
+        return int(status[0])
+    if status.upper().startswith(str(WEEKEND_CODE)):
+        return STATUS_WEEKEND
+    return STATUS_OTHER
+
+
+class Timesheet:
+    def __init__(self, compiled):
+        self.tab_no = list(compiled["tab_no"])
+        self.graph = list(compiled.get("graph") or [None] * len(self.tab_no))
+        self.has_tab_no = np.array([t is not None for t in self.tab_no], dtype=bool)
+
+        # День -> столбец табеля ("5" или "5.0")
+        status = compiled["status"]
+        self.day_columns = {}
+        for day in range(1, MAX_DAYS + 1):
+            for col in (str(day), f"{day}.0"):
+                if col in status:
+                    self.day_columns[day] = col
+                    break
+
+        # Матрица кодов: строки — водители табеля, столбцы — дни 1..MAX_DAYS
+        self.codes = np.zeros((len(self.tab_no), MAX_DAYS + 1), dtype=np.int8)
+        for day, col in self.day_columns.items():
+            self.codes[:, day] = [_status_code(s) for s in status[col]]
+
+        self._index_cache = {}
+        self._lock = threading.Lock()
+
+    def _check_day(self, day):
+        if day not in self.day_columns:
+            raise ValueError(f"Ошибка: В табеле нет колонки с названием '{day}'")
+
+    def indices(self, day, code):
+        """Строки табеля с кодом code в день day (массив, кэшируется)."""
+        self._check_day(day)
+        key = (day, code)
+        idx = self._index_cache.get(key)
+        if idx is None:
+            idx = np.flatnonzero((self.codes[:, day] == code) & self.has_tab_no)
+            with self._lock:
+                self._index_cache[key] = idx
+        return idx
+
+    def drivers_on_shift(self, day, shift):
+        """Табельные со сменой shift в день day (порядок строк табеля)."""
+        return [self.tab_no[i] for i in self.indices(day, int(shift))]
+
+    def weekend_drivers(self, day):
+        """Табельные с выходным (WEEKEND_CODE) в день day."""
+        return [self.tab_no[i] for i in self.indices(day, STATUS_WEEKEND)]
+
+    def graph_by_tab_no(self):
+        """Тип графика (4х2, 5х2, ...) по табельному."""
+        return {t: g for t, g in zip(self.tab_no, self.graph) if t is not None}
+
+
+# Версия книги (sha256) -> Timesheet
+_timesheets = {}
+_timesheets_lock = threading.Lock()
+
+
+def get_timesheet(file_path=FILE_PATH):
+    """Общий Timesheet для книги; пересобирается, только если книга изменилась."""
+    try:
+        compiled = get_compiled_workbook(file_path)
+    except Exception as e:
+        print(f"[WARN] Кэш книги недоступен: {e}")
+        compiled = None
+
+    if compiled is None or compiled.get("timesheet") is None:
+        return Timesheet(compile_timesheet(pd.read_excel(file_path, sheet_name=TAB_SHEET_NAME)))
+
+    key = compiled["sha256"]
+    with _timesheets_lock:
+        timesheet = _timesheets.get(key)
+        cache_lookup("timesheet", timesheet is not None)
+        if timesheet is None:
+            timesheet = _timesheets[key] = Timesheet(compiled["timesheet"])
+        return timesheet
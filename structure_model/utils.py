@@ -0,0 +1,47 @@
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+
+def normalize_tab_no(value):
+    """Табельный номер к строке без .0 (None для пустых значений)."""
+    if pd.isna(value):
+        return None
+    try:
+        return str(int(float(value)))
+    except (ValueError, TypeError):
+        text = str(value).strip()
+        return text or None
+
+
+def file_stamp(path):
+    """(mtime_ns, размер) файла или None, если файла нет."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+@contextmanager
+def atomic_write(path, mode="wb", **kwargs):
+    """
+    Запись файла целиком: пишется временный файл рядом с path (свой у каждого
+    процесса и потока), после успешной записи он заменяет path (os.replace),
+    при ошибке удаляется. Читатели видят либо старый файл, либо новый.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, mode, **kwargs) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
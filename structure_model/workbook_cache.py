@@ -0,0 +1,216 @@
+"""
+Скомпилированный кэш книги с расписаниями (data/data.xlsx).
+
+Книга разбирается целиком один раз: для каждого листа расписания сохраняются
+столбцы времени обеих смен, для листа TAB_SHEET_NAME — табельные номера и
+статусы по дням. Результат пишется в CACHE_DIR в бинарном виде (pickle) и
+привязывается к mtime и SHA-256 исходного файла. При изменении файла кэш
+пересобирается автоматически.
+
+Прогрев из командной строки:
+    python -m structure_model.workbook_cache [--force] [файлы...]
+"""
+import argparse
+import hashlib
+import pickle
+from pathlib import Path
+
+import pandas as pd
+
+from structure_model.config import (
+    FILE_PATH,
+    CACHE_DIR,
+    TAB_SHEET_NAME,
+    COL_SHIFT_1_START,
+    COL_SHIFT_1_END,
+    COL_SHIFT_2_START,
+    COL_SHIFT_2_END,
+)
+from structure_model.metrics import cache_lookup
+from structure_model.utils import atomic_write, normalize_tab_no
+
+# Увеличивать при любом изменении структуры кэша
+CACHE_FORMAT_VERSION = 2
+
+# Столбцы листов расписания, которые попадают в кэш (0-based, как в pandas)
+CACHED_COLUMNS = (COL_SHIFT_1_START, COL_SHIFT_1_END, COL_SHIFT_2_START, COL_SHIFT_2_END)
+
+# Кэш в памяти процесса: путь к книге -> скомпилированные данные
+_compiled = {}
+
+
+# =============================================================================
+# КОМПИЛЯЦИЯ
+# =============================================================================
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _cell_text(value):
+    """Значение ячейки в виде строки (None для пустых), как его видит парсер смен."""
+    if pd.isna(value):
+        return None
+    return str(value)
+
+
+def compile_schedule_sheet(df):
+    """Столбцы времени листа расписания (df прочитан с header=None)."""
+    return {
+        "n_rows": len(df),
+        "columns": {
+            col: [_cell_text(v) for v in df.iloc[:, col].tolist()]
+            for col in CACHED_COLUMNS
+            if col < df.shape[1]
+        },
+    }
+
+
+def compile_timesheet(df):
+    """Табельные номера, тип графика и статусы по дням листа табеля (df прочитан с header=0)."""
+    df.columns = df.columns.astype(str)
+    return {
+        "columns": list(df.columns),
+        "tab_no": [normalize_tab_no(v) for v in df.iloc[:, 0].tolist()],
+        "graph": [None if pd.isna(v) else v for v in df.iloc[:, 1].tolist()] if df.shape[1] > 1 else [],
+        "status": {
+            col: [str(v).strip() for v in df.iloc[:, idx].tolist()]
+            for idx, col in enumerate(df.columns)
+        },
+    }
+
+
+def _compile(path, stat, digest):
+    sheets = {}
+    timesheet = None
+    with pd.ExcelFile(path) as xl:
+        for name in xl.sheet_names:
+            if name == TAB_SHEET_NAME:
+                timesheet = compile_timesheet(xl.parse(name))
+            else:
+                sheets[name] = compile_schedule_sheet(xl.parse(name, header=None))
+
+    return {
+        "version": CACHE_FORMAT_VERSION,
+        "source": str(path),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": digest,
+        "sheets": sheets,
+        "timesheet": timesheet,
+    }
+
+
+# =============================================================================
+# ХРАНЕНИЕ
+# =============================================================================
+
+def cache_file_for(file_path):
+    return CACHE_DIR / f"{Path(file_path).name}.cache.pkl"
+
+
+def _read_cache_file(cache_path):
+    try:
+        with open(cache_path, "rb") as f:
+            data = pickle.load(f)
+    except Exception:
+        return None
+    if not isinstance(data, dict) or data.get("version") != CACHE_FORMAT_VERSION:
+        return None
+    return data
+
+
+def _write_cache_file(cache_path, data):
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(cache_path) as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError as e:
+        print(f"[WARN] Не удалось сохранить кэш {cache_path}: {e}")
+
+
+def get_compiled_workbook(file_path=FILE_PATH, force=False):
+    """
+    Возвращает скомпилированную книгу, при необходимости пересобирая кэш.
+
+    Проверка актуальности: совпадение mtime и размера — кэш верен сразу;
+    иначе сравнивается SHA-256 (файл могли просто «потрогать»).
+    """
+    path = Path(file_path).resolve()
+    stat = path.stat()
+
+    if not force:
+        mem = _compiled.get(path)
+        if mem and mem["mtime_ns"] == stat.st_mtime_ns and mem["size"] == stat.st_size:
+            cache_lookup("workbook", True)
+            return mem
+
+    cache_path = cache_file_for(path)
+    digest = None
+
+    if not force:
+        disk = _read_cache_file(cache_path)
+        if disk and disk["source"] == str(path):
+            if disk["mtime_ns"] == stat.st_mtime_ns and disk["size"] == stat.st_size:
+                cache_lookup("workbook", True)
+                _compiled[path] = disk
+                return disk
+
+            digest = _file_sha256(path)
+            if disk["sha256"] == digest:
+                disk["mtime_ns"] = stat.st_mtime_ns
+                disk["size"] = stat.st_size
+                _write_cache_file(cache_path, disk)
+                cache_lookup("workbook", True)
+                _compiled[path] = disk
+                return disk
+
+    cache_lookup("workbook", False)
+    print(f"[Кэш] Компиляция {path.name}")
+    data = _compile(path, stat, digest or _file_sha256(path))
+    _write_cache_file(cache_path, data)
+    _compiled[path] = data
+    return data
+
+
+# =============================================================================
+# ДОСТУП ДЛЯ excel_io
+# =============================================================================
+
+def get_sheet_columns(file_path, sheet_name, columns):
+    """
+    (n_rows, [значения столбца, ...]) из кэша или None,
+    если листа/столбца в кэше нет — тогда вызывающий читает Excel сам.
+    """
+    try:
+        data = get_compiled_workbook(file_path)
+    except Exception as e:
+        print(f"[WARN] Кэш книги недоступен: {e}")
+        return None
+
+    sheet = data["sheets"].get(sheet_name)
+    if sheet is None or any(col not in sheet["columns"] for col in columns):
+        return None
+    return sheet["n_rows"], [sheet["columns"][col] for col in columns]
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Прогрев кэша Excel-книг с расписаниями")
+    parser.add_argument("files", nargs="*", default=[str(FILE_PATH)])
+    parser.add_argument("--force", action="store_true", help="пересобрать даже актуальный кэш")
+    args = parser.parse_args()
+
+    for file_path in args.files:
+        data = get_compiled_workbook(file_path, force=args.force)
+        print(
+            f"[Кэш] {file_path}: листов расписаний {len(data['sheets'])}, "
+            f"табель: {'есть' if data['timesheet'] else 'нет'} -> {cache_file_for(file_path)}"
+        )